@@ -7,15 +7,33 @@ from sqlalchemy.exc import IntegrityError, ProgrammingError, DataError, SQLAlche
 
 db = SQLAlchemy()
 
+# Exclusion constraints backing the overlap triggers when two inserts race past them
+CONSTRAINT_MESSAGES = {
+    'excl_booking_room_stay': "⛔ Cannot book: Room already booked or rented for selected dates.",
+    'excl_rental_room_stay': "⛔ Cannot rent: Room already booked or rented for selected dates.",
+}
+
 def create_app():
     app = Flask(__name__, template_folder=os.path.abspath("../frontend/templates")) 
     app.config.from_object(Config)
 
     db.init_app(app)
 
+    from search_cache import search_cache
+    search_cache.init_app(app)
+
+    import idempotency
+    idempotency.init_app(app)
+
+    import round_trips
+    round_trips.init_app(app)
+
     from routes.__init__ import init_app  
     init_app(app)
 
+    import commands
+    commands.init_app(app)
+
     @app.route('/')
     def root():
         return redirect(url_for('auth.login'))
@@ -31,7 +49,9 @@ def create_app():
 
         # Specific SQLAlchemy error messages
         if isinstance(e, IntegrityError):
-            friendly_message = "❌ Operation failed due to a database constraint."
+            friendly_message = CONSTRAINT_MESSAGES.get(
+                e.orig.diag.constraint_name, "❌ Operation failed due to a database constraint."
+            )
         elif isinstance(e, ProgrammingError):
             friendly_message = "⚠️ A programming error occurred. Please contact support."
         elif isinstance(e, DataError):
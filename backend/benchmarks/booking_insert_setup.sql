@@ -0,0 +1,53 @@
+-- Benchmark setup: booking inserts per second (run booking_insert.pgbench afterwards)
+--
+-- Adds `customers` customers and bookings_per_room past bookings for every room so that
+-- each validation probe runs against realistically sized Booking and Rental tables.
+-- Every customer keeps fewer than 5 active bookings and all room problems are resolved,
+-- so the benchmark inserts pass validation and measure the full trigger pipeline.
+-- Run it against a scratch copy of the database, never against real data:
+--   psql -d ehotels_bench -v customers=10000 -v bookings_per_room=5000 -f benchmarks/booking_insert_setup.sql
+
+\set ON_ERROR_STOP on
+\if :{?customers}
+\else
+    \set customers 10000
+\endif
+\if :{?bookings_per_room}
+\else
+    \set bookings_per_room 5000
+\endif
+\timing on
+
+INSERT INTO Customer (FullName, Address, IDType, IDNumber, RegistrationDate)
+SELECT 'Bench Customer ' || i, i || ' Benchmark Road', 'Passport', 'BENCH' || LPAD(i::TEXT, 10, '0'), DATE '2020-01-01'
+FROM generate_series(1, :customers) AS i;
+
+-- Bulk load without the row triggers (the per-row checks would make this quadratic)
+ALTER TABLE Booking DISABLE TRIGGER USER;
+
+-- One 2-night stay every 3 days per room, ending before 2020; only cancelled or checked-in
+-- history, so no customer gets closer to the active booking limit
+INSERT INTO Booking (CustomerID, HotelID, RoomID, BookingDate, CheckInDate, CheckOutDate, Status)
+SELECT
+    1 + (i % (SELECT COUNT(*) FROM Customer)),
+    r.HotelID,
+    r.RoomID,
+    DATE '2020-01-01' - 3 * (i + 1) - 7,
+    DATE '2020-01-01' - 3 * (i + 1),
+    DATE '2020-01-01' - 3 * (i + 1) + 2,
+    'Cancelled'
+FROM Room r
+CROSS JOIN generate_series(0, :bookings_per_room - 1) AS i;
+
+ALTER TABLE Booking ENABLE TRIGGER USER;
+
+UPDATE RoomProblems SET Resolved = TRUE WHERE Resolved = FALSE;
+
+SELECT rebuild_room_calendar();
+ANALYZE Customer;
+ANALYZE Booking;
+ANALYZE Rental;
+ANALYZE RoomProblems;
+
+SELECT COUNT(*) AS customers FROM Customer;
+SELECT COUNT(*) AS bookings FROM Booking;
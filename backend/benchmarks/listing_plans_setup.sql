@@ -0,0 +1,164 @@
+-- Plan check setup: scales every table behind the employee listing pages (run listing_plans.py afterwards)
+--
+-- Adds `hotels` large hotels (rooms_per_hotel rooms, 200 employees, 5 reported problems per room),
+-- `customers` customers, bookings_per_room past bookings and rentals per room, and as many archived
+-- bookings and rentals spread over the last three years. Both the chain-wide (admin) and the
+-- single-hotel (manager) pages then have far more rows than one page, as in production.
+-- Run it against a scratch copy of the database, never against real data:
+--   psql -d ehotels_bench -v hotels=200 -v rooms_per_hotel=200 -v bookings_per_room=10 -f benchmarks/listing_plans_setup.sql
+
+\set ON_ERROR_STOP on
+\if :{?hotels}
+\else
+    \set hotels 200
+\endif
+\if :{?rooms_per_hotel}
+\else
+    \set rooms_per_hotel 200
+\endif
+\if :{?customers}
+\else
+    \set customers 50000
+\endif
+\if :{?bookings_per_room}
+\else
+    \set bookings_per_room 10
+\endif
+\timing on
+
+INSERT INTO Hotel (HotelChainID, HotelName, Rating, Address, Category, Num_Rooms)
+SELECT
+    (SELECT MIN(HotelChainID) FROM HotelChain) + i % (SELECT COUNT(*) FROM HotelChain),
+    'Bench Hotel ' || i,
+    1 + i % 5,
+    i || ' Benchmark Avenue',
+    (ARRAY['Luxury', 'Resort', 'Boutique'])[1 + i % 3],
+    :rooms_per_hotel - i % 7
+FROM generate_series(1, :hotels) AS i;
+
+CREATE TEMP TABLE bench_hotel AS
+SELECT HotelID FROM Hotel WHERE HotelName LIKE 'Bench Hotel %';
+
+INSERT INTO Room (RoomID, HotelID, Price, Capacity, ViewType, Extendable, Status)
+SELECT
+    100 + n,
+    h.HotelID,
+    80 + (h.HotelID * 7 + n * 13) % 400,
+    (ARRAY['single', 'double', 'triple', 'family', 'suite'])[1 + n % 5],
+    (ARRAY['sea_view', 'mountain_view', 'both', 'none'])[1 + (h.HotelID + n) % 4],
+    n % 2 = 0,
+    'Available'
+FROM bench_hotel h
+CROSS JOIN generate_series(1, :rooms_per_hotel) AS n;
+
+INSERT INTO Employee (HotelID, FullName, Address, SSN, Position)
+SELECT
+    h.HotelID,
+    'Bench Employee ' || h.HotelID || '-' || n,
+    n || ' Staff Street',
+    'BENCH-' || h.HotelID || '-' || n,
+    CASE WHEN n = 1 THEN 'Manager'
+         ELSE (ARRAY['Receptionist', 'Housekeeping', 'Maintenance', 'Security'])[1 + n % 4] END
+FROM bench_hotel h
+CROSS JOIN generate_series(1, 200) AS n;
+
+INSERT INTO Customer (FullName, Address, IDType, IDNumber, RegistrationDate)
+SELECT 'Bench Customer ' || i, i || ' Benchmark Road',
+       (ARRAY['SSN', 'SIN', 'Driving License', 'Passport'])[1 + i % 4],
+       'BENCH' || LPAD(i::TEXT, 10, '0'), DATE '2020-01-01' + i % 1500
+FROM generate_series(1, :customers) AS i;
+
+-- Bulk load without the row triggers (the per-row checks would make this quadratic)
+ALTER TABLE RoomProblems DISABLE TRIGGER USER;
+ALTER TABLE Booking DISABLE TRIGGER USER;
+ALTER TABLE Rental DISABLE TRIGGER USER;
+
+INSERT INTO RoomProblems (HotelID, RoomID, Problem, ReportDate, Resolved)
+SELECT r.HotelID, r.RoomID, 'Bench problem ' || i, CURRENT_DATE - (r.HotelID + r.RoomID * 7 + i * 131) % 700,
+       i > 0 OR r.RoomID % 8 <> 0
+FROM Room r
+JOIN bench_hotel h ON h.HotelID = r.HotelID
+CROSS JOIN generate_series(0, 4) AS i;
+
+-- One 2-night stay every 3 days per room, all in the past; bookings first, rentals after them
+INSERT INTO Booking (CustomerID, HotelID, RoomID, BookingDate, CheckInDate, CheckOutDate, Status)
+SELECT
+    (SELECT MIN(CustomerID) FROM Customer) + (r.HotelID * 20 + r.RoomID + i) % :customers,
+    r.HotelID,
+    r.RoomID,
+    CURRENT_DATE - 3 * (i + 1) - 7,
+    CURRENT_DATE - 3 * (i + 1),
+    CURRENT_DATE - 3 * (i + 1) + 2,
+    (ARRAY['Cancelled', 'Checked-in'])[1 + i % 2]
+FROM Room r
+JOIN bench_hotel h ON h.HotelID = r.HotelID
+CROSS JOIN generate_series(0, :bookings_per_room - 1) AS i;
+
+INSERT INTO Rental (CustomerID, HotelID, RoomID, EmployeeID, CheckInDate, CheckOutDate, Status,
+                    PaymentAmount, PaymentDate, PaymentMethod)
+SELECT
+    (SELECT MIN(CustomerID) FROM Customer) + (r.HotelID * 20 + r.RoomID + i) % :customers,
+    r.HotelID,
+    r.RoomID,
+    (SELECT MIN(EmployeeID) FROM Employee e WHERE e.HotelID = r.HotelID),
+    CURRENT_DATE - 3 * (:bookings_per_room + i + 1),
+    CURRENT_DATE - 3 * (:bookings_per_room + i + 1) + 2,
+    CASE WHEN (r.RoomID + i) % 5 = 0 THEN 'Ongoing' ELSE 'Completed' END,
+    100 + (r.HotelID + r.RoomID * 31 + i) % 900,
+    CURRENT_DATE - 3 * (:bookings_per_room + i + 1) + 2,
+    (ARRAY['Cash', 'Credit Card', 'Debit Card'])[1 + i % 3]
+FROM Room r
+JOIN bench_hotel h ON h.HotelID = r.HotelID
+CROSS JOIN generate_series(0, :bookings_per_room - 1) AS i;
+
+ALTER TABLE RoomProblems ENABLE TRIGGER USER;
+ALTER TABLE Booking ENABLE TRIGGER USER;
+ALTER TABLE Rental ENABLE TRIGGER USER;
+
+-- Archived history: bookings_per_room rows per room and table, spread over the last three years
+INSERT INTO BookingArchive (BookingID, HotelID, CustomerName, HotelName, RoomIdentifier,
+                            BookingDate, CheckInDate, CheckOutDate, Status, ArchiveDate)
+SELECT
+    1000000 + ROW_NUMBER() OVER (),
+    r.HotelID,
+    'Bench Customer ' || (r.HotelID * 20 + r.RoomID + i) % :customers,
+    'Bench Hotel ' || r.HotelID,
+    'Room ' || r.RoomID,
+    CURRENT_DATE - 1100 + (r.HotelID + r.RoomID * 17 + i * 211) % 1090 - 10,
+    CURRENT_DATE - 1100 + (r.HotelID + r.RoomID * 17 + i * 211) % 1090,
+    CURRENT_DATE - 1100 + (r.HotelID + r.RoomID * 17 + i * 211) % 1090 + 2,
+    (ARRAY['Cancelled', 'Checked-in'])[1 + i % 2],
+    CURRENT_DATE - 1100 + (r.HotelID + r.RoomID * 17 + i * 211) % 1090 + 3
+FROM Room r
+JOIN bench_hotel h ON h.HotelID = r.HotelID
+CROSS JOIN generate_series(0, :bookings_per_room - 1) AS i;
+
+INSERT INTO RentalArchive (RentalID, HotelID, CustomerName, HotelName, RoomIdentifier, EmployeeName, BookingID,
+                           CheckInDate, CheckOutDate, Status, PaymentAmount, PaymentDate, PaymentMethod, ArchiveDate)
+SELECT
+    1000000 + ROW_NUMBER() OVER (),
+    r.HotelID,
+    'Bench Customer ' || (r.HotelID * 20 + r.RoomID + i) % :customers,
+    'Bench Hotel ' || r.HotelID,
+    'Room ' || r.RoomID,
+    'Bench Employee ' || r.HotelID || '-' || (1 + i % 3),
+    NULL,
+    CURRENT_DATE - 1100 + (r.HotelID * 3 + r.RoomID * 29 + i * 197) % 1090,
+    CURRENT_DATE - 1100 + (r.HotelID * 3 + r.RoomID * 29 + i * 197) % 1090 + 2,
+    'Completed',
+    100 + (r.HotelID + r.RoomID + i) % 900,
+    CURRENT_DATE - 1100 + (r.HotelID * 3 + r.RoomID * 29 + i * 197) % 1090 + 2,
+    'Cash',
+    CURRENT_DATE - 1100 + (r.HotelID * 3 + r.RoomID * 29 + i * 197) % 1090 + 3
+FROM Room r
+JOIN bench_hotel h ON h.HotelID = r.HotelID
+CROSS JOIN generate_series(0, :bookings_per_room - 1) AS i;
+
+SELECT rebuild_room_calendar();
+SELECT repair_active_booking_counts();
+ANALYZE;
+
+SELECT (SELECT COUNT(*) FROM Hotel) AS hotels, (SELECT COUNT(*) FROM Room) AS rooms,
+       (SELECT COUNT(*) FROM Employee) AS employees, (SELECT COUNT(*) FROM Customer) AS customers,
+       (SELECT COUNT(*) FROM Booking) AS bookings, (SELECT COUNT(*) FROM Rental) AS rentals,
+       (SELECT COUNT(*) FROM BookingArchive) AS archived_bookings, (SELECT COUNT(*) FROM RentalArchive) AS archived_rentals;
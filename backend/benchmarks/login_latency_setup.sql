@@ -0,0 +1,29 @@
+-- Login latency setup: grows the Customer table to `customers` rows (run login_latency.py afterwards)
+--
+-- Adds generated customers until there are `customers` in total, with mixed-case and accented names
+-- so the case-insensitive name check is exercised, then refreshes the planner statistics.
+-- Run it against a scratch copy of the database, never against real data:
+--   psql -d ehotels_bench -v customers=1000000 -f benchmarks/login_latency_setup.sql
+
+\set ON_ERROR_STOP on
+\if :{?customers}
+\else
+    \set customers 1000000
+\endif
+\timing on
+
+-- Numbering continues from the current row count, so the script can be re-run to grow the table further
+SELECT COUNT(*) AS existing FROM Customer \gset
+
+INSERT INTO Customer (FullName, Address, IDType, IDNumber, RegistrationDate)
+SELECT (ARRAY['Login Customer ', 'LOGIN Élise ', 'login Çelik '])[1 + i % 3] || i,
+       i || ' Latency Lane',
+       (ARRAY['SSN', 'SIN', 'Driving License', 'Passport'])[1 + i % 4],
+       'LOGIN' || LPAD(i::TEXT, 10, '0'),
+       DATE '2020-01-01' + i % 1500
+FROM generate_series(:existing + 1, :customers) AS i;
+
+ANALYZE Customer;
+ANALYZE Employee;
+
+SELECT (SELECT COUNT(*) FROM Customer) AS customers, (SELECT COUNT(*) FROM Employee) AS employees;
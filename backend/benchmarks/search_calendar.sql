@@ -0,0 +1,77 @@
+-- Benchmark: room search availability, OVERLAPS subqueries vs RoomCalendar lookup
+--
+-- Loads bookings_per_room historical bookings for every room (2,000,000 with the
+-- default 10000 and the 200 rooms from populate.sql), then runs EXPLAIN ANALYZE on
+-- the old and the new search_rooms query for the same stay.
+-- Run it against a scratch copy of the database, never against real data:
+--   psql -d ehotels_bench -v bookings_per_room=10000 -f benchmarks/search_calendar.sql
+
+\set ON_ERROR_STOP on
+\if :{?bookings_per_room}
+\else
+    \set bookings_per_room 10000
+\endif
+\timing on
+
+-- Bulk load without the row triggers (the overlap/limit checks would make this quadratic)
+ALTER TABLE Booking DISABLE TRIGGER USER;
+
+-- One 2-night stay every 3 days per room, from 2000-01-01 onwards; every 10th is cancelled
+INSERT INTO Booking (CustomerID, HotelID, RoomID, BookingDate, CheckInDate, CheckOutDate, Status)
+SELECT
+    1 + (i % (SELECT COUNT(*) FROM Customer)),
+    r.HotelID,
+    r.RoomID,
+    DATE '2000-01-01' + i * 3 - 7,
+    DATE '2000-01-01' + i * 3,
+    DATE '2000-01-01' + i * 3 + 2,
+    CASE WHEN i % 10 = 0 THEN 'Cancelled' ELSE 'Checked-in' END
+FROM Room r
+CROSS JOIN generate_series(0, :bookings_per_room - 1) AS i;
+
+ALTER TABLE Booking ENABLE TRIGGER USER;
+
+SELECT rebuild_room_calendar();
+ANALYZE Booking;
+ANALYZE Rental;
+ANALYZE RoomCalendar;
+
+SELECT COUNT(*) AS bookings FROM Booking;
+SELECT COUNT(*) AS calendar_nights FROM RoomCalendar;
+
+-- A stay in the middle of the generated history
+\set checkin '''2040-06-01'''
+\set checkout '''2040-06-04'''
+
+-- Before: correlated OVERLAPS subqueries against Booking and Rental
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT r.*, h.HotelName, h.Address, hc.ChainName, h.Rating, h.Num_Rooms
+FROM Room r
+JOIN Hotel h ON r.HotelID = h.HotelID
+JOIN HotelChain hc ON h.HotelChainID = hc.HotelChainID
+WHERE
+    NOT EXISTS (
+        SELECT 1 FROM Booking b
+        WHERE b.RoomID = r.RoomID AND b.HotelID = r.HotelID
+        AND (b.CheckInDate, b.CheckOutDate) OVERLAPS (DATE :checkin, DATE :checkout)
+    ) AND
+    NOT EXISTS (
+        SELECT 1 FROM Rental rt
+        WHERE rt.RoomID = r.RoomID AND rt.HotelID = r.HotelID
+        AND (rt.CheckInDate, rt.CheckOutDate) OVERLAPS (DATE :checkin, DATE :checkout)
+    )
+ORDER BY r.Price;
+
+-- After: per-night lookup on the RoomCalendar primary key
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT r.*, h.HotelName, h.Address, hc.ChainName, h.Rating, h.Num_Rooms
+FROM Room r
+JOIN Hotel h ON r.HotelID = h.HotelID
+JOIN HotelChain hc ON h.HotelChainID = hc.HotelChainID
+WHERE
+    NOT EXISTS (
+        SELECT 1 FROM RoomCalendar rc
+        WHERE rc.HotelID = r.HotelID AND rc.RoomID = r.RoomID
+        AND rc.Night >= DATE :checkin AND rc.Night < DATE :checkout
+    )
+ORDER BY r.Price;
@@ -0,0 +1,113 @@
+import time
+from datetime import date
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from app import db
+from exports import EXPORTS, copy_csv
+from idempotency import sweep_expired
+from maintenance import purge_history, reconcile_rentals, rollover_room_status
+
+
+@click.command('repair-booking-counters')
+@with_appcontext
+def repair_booking_counters():
+    """Recompute every customer's active booking counter from the Booking table."""
+    try:
+        repaired = db.session.execute(text("SELECT repair_active_booking_counts()")).scalar()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    click.echo(f"✅ Repaired {repaired} customer booking counter(s).")
+
+
+@click.command('sweep-idempotency-keys')
+@click.option('--batch-size', default=1000, show_default=True, help="Keys deleted per transaction.")
+@with_appcontext
+def sweep_idempotency_keys(batch_size):
+    """Delete expired idempotency keys and their stored responses."""
+    deleted = sweep_expired(batch_size)
+    click.echo(f"✅ Deleted {deleted} expired idempotency key(s).")
+
+
+@click.command('reconcile-rentals')
+@click.option('--batch-size', default=500, show_default=True, help="Rows updated per transaction.")
+@click.option('--every', type=int, help="Keep running, reconciling every this many seconds.")
+@with_appcontext
+def reconcile_rentals_command(batch_size, every):
+    """Complete rentals past their check-out date and mark rooms of today's rentals Occupied."""
+    while True:
+        completed, occupied = reconcile_rentals(batch_size)
+        click.echo(f"✅ Completed {completed} rental(s), marked {occupied} room(s) Occupied.")
+        if not every:
+            return
+        time.sleep(every)
+
+
+@click.command('rollover-room-status')
+@with_appcontext
+def rollover_room_status_command():
+    """Recompute every room's status for today from bookings, rentals and unresolved problems."""
+    started = time.perf_counter()
+    changed, hotels = rollover_room_status()
+    click.echo(f"✅ Updated {changed} room status(es) across {hotels} hotel(s) in {time.perf_counter() - started:.2f}s.")
+
+
+@click.command('create-archive-partitions')
+@click.option('--year', type=int, multiple=True, help="Year to create (repeatable). Defaults to this year and the next.")
+@with_appcontext
+def create_archive_partitions(year):
+    """Create the yearly BookingArchive and RentalArchive partitions, moving their rows out of the default partitions."""
+    this_year = date.today().year
+    created = 0
+    try:
+        for partition_year in year or (this_year, this_year + 1):
+            created += db.session.execute(text("SELECT create_archive_partitions(:year)"),
+                                          {'year': partition_year}).scalar()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    click.echo(f"✅ Created {created} archive partition(s).")
+
+
+@click.command('purge-history')
+@click.option('--before', required=True, type=click.DateTime(formats=['%Y-%m-%d']),
+              help="Purge stays that ended before this date (YYYY-MM-DD).")
+@click.option('--batch-size', default=1000, show_default=True, help="Rows deleted (and archived) per transaction.")
+@with_appcontext
+def purge_history_command(before, batch_size):
+    """Move completed rentals and finished bookings that ended before a date into the archives."""
+    if before.date() > date.today():
+        raise click.BadParameter("must not be in the future.", param_hint="--before")
+    started = time.perf_counter()
+    rentals, bookings = purge_history(before.date(), batch_size)
+    click.echo(f"✅ Archived {rentals} rental(s) and {bookings} booking(s) in {time.perf_counter() - started:.2f}s.")
+
+
+@click.command('export-csv')
+@click.argument('kind', type=click.Choice(list(EXPORTS)))
+@click.option('--from', 'date_from', type=click.DateTime(formats=['%Y-%m-%d']),
+              help="First date to include (check-in date, or archive date for archives).")
+@click.option('--to', 'date_to', type=click.DateTime(formats=['%Y-%m-%d']), help="Last date to include.")
+@click.option('--hotel-id', type=int, help="Only this hotel.")
+@click.option('--output', '-o', type=click.File('wb'), default='-', help="File to write (default: stdout).")
+@with_appcontext
+def export_csv(kind, date_from, date_to, hotel_id, output):
+    """Export bookings, rentals or an archive as CSV, streamed with COPY."""
+    started = time.perf_counter()
+    copied = copy_csv(kind, output, hotel_id=hotel_id,
+                      date_from=date_from.date() if date_from else None,
+                      date_to=date_to.date() if date_to else None)
+    click.echo(f"✅ Exported {copied} row(s) in {time.perf_counter() - started:.2f}s.", err=True)
+
+
+def init_app(app):
+    app.cli.add_command(repair_booking_counters)
+    app.cli.add_command(sweep_idempotency_keys)
+    app.cli.add_command(reconcile_rentals_command)
+    app.cli.add_command(rollover_room_status_command)
+    app.cli.add_command(create_archive_partitions)
+    app.cli.add_command(purge_history_command)
+    app.cli.add_command(export_csv)
@@ -0,0 +1,43 @@
+import random
+import time
+from flask import current_app
+from sqlalchemy.exc import DBAPIError
+from app import db
+
+# Every write that books or rents a room locks the room's row first (SELECT ... FOR NO KEY UPDATE
+# inside the write's own statement; the Booking and Rental triggers take the same lock), so two
+# writers for the same room run one after the other and the second sees the first one's committed
+# row instead of racing past its checks. NO KEY UPDATE leaves foreign key checks unblocked.
+
+# serialization_failure, deadlock_detected: PostgreSQL rolled the transaction back and it is safe to run again
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+
+def is_retryable(error):
+    return getattr(getattr(error, 'orig', None), 'pgcode', None) in RETRYABLE_SQLSTATES
+
+
+def run_in_transaction(work, *args, **kwargs):
+    """
+    Run work(*args, **kwargs) and commit, retrying the whole transaction when PostgreSQL
+    aborts it with a serialization failure or a deadlock.
+
+    Returns what work returned. Any other error (a trigger rejecting the booking, a
+    constraint violation) is rolled back and re-raised unchanged for the error handler.
+    """
+    # Always run once: TRANSACTION_RETRY_ATTEMPTS of 0 or less means no retries, not no transaction
+    attempts = max(1, current_app.config['TRANSACTION_RETRY_ATTEMPTS'])
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work(*args, **kwargs)
+            db.session.commit()
+            return result
+        except DBAPIError as e:
+            db.session.rollback()
+            if attempt == attempts or not is_retryable(e):
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
+        # Jittered backoff so the transactions that just collided do not collide again
+        time.sleep(random.uniform(0, current_app.config['TRANSACTION_RETRY_DELAY'] * 2 ** attempt))
@@ -10,3 +10,25 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY", "dev")
+
+    # In-process cache of room search pages (entries, seconds)
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1024))
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 60))
+
+    # Comma-separated keys accepted in the X-API-Key header of the partner search API
+    API_KEYS = [key for key in os.getenv("API_KEYS", "").split(",") if key]
+
+    # Retries of a booking or rental transaction aborted by a deadlock or serialization failure
+    TRANSACTION_RETRY_ATTEMPTS = int(os.getenv("TRANSACTION_RETRY_ATTEMPTS", 3))
+    TRANSACTION_RETRY_DELAY = float(os.getenv("TRANSACTION_RETRY_DELAY", 0.05))
+
+    # Stored responses of idempotent POSTs: kept this long (seconds), and how long a retry
+    # waits for the first request with the same key to finish before getting a 409
+    IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 86400))
+    IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", 5))
+    # How long a request that is still running holds its key (seconds). If its worker dies, a retry
+    # can take the key over after this; keep it well above the slowest booking or rental request
+    IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", 30))
+
+    # Report each request's database round trips in an X-DB-Round-Trips header (benchmarks/round_trips.py)
+    COUNT_DB_ROUND_TRIPS = os.getenv("COUNT_DB_ROUND_TRIPS", "") == "1"
@@ -1,3 +1,6 @@
+-- btree_gist lets GiST indexes and exclusion constraints combine = on integers with && on ranges
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- HotelChain Constraints
 ALTER TABLE HotelChain
     ADD CONSTRAINT CHK_HotelChain_NumHotels CHECK (Num_Hotels > 0);
@@ -48,12 +51,16 @@ ALTER TABLE Booking
     ADD CONSTRAINT CHK_Booking_Status CHECK (Status IN ('Pending', 'Checked-in', 'Cancelled')),
     ADD CONSTRAINT CHK_Booking_Dates_If_Rented CHECK ((Status = 'Checked-in' AND CheckInDate IS NOT NULL AND CheckOutDate IS NOT NULL) OR (Status != 'Checked-in')),
     ADD CONSTRAINT CHK_Booking_Date_Order CHECK (CheckOutDate > CheckInDate),
-    ADD CONSTRAINT CHK_Booking_BookingDate CHECK (BookingDate <= CheckInDate);
+    ADD CONSTRAINT CHK_Booking_BookingDate CHECK (BookingDate <= CheckInDate),
+    ADD CONSTRAINT EXCL_Booking_Room_Stay EXCLUDE USING gist (HotelID WITH =, RoomID WITH =, Stay WITH &&)
+        WHERE (Status IN ('Pending', 'Checked-in'));
 
 -- Rental Constraints
 ALTER TABLE Rental
     ADD CONSTRAINT CHK_Rental_Status CHECK (Status IN ('Ongoing', 'Completed')),
     ADD CONSTRAINT CHK_Rental_Date_Order CHECK (CheckOutDate >= CheckInDate),
-    ADD CONSTRAINT CHK_Rental_Payment_If_Completed CHECK ((Status = 'Completed' AND PaymentDate IS NOT NULL AND PaymentMethod IS NOT NULL) OR (Status != 'Completed'));
+    ADD CONSTRAINT CHK_Rental_Payment_If_Completed CHECK ((Status = 'Completed' AND PaymentDate IS NOT NULL AND PaymentMethod IS NOT NULL) OR (Status != 'Completed')),
+    ADD CONSTRAINT EXCL_Rental_Room_Stay EXCLUDE USING gist (HotelID WITH =, RoomID WITH =, Stay WITH &&)
+        WHERE (Status = 'Ongoing');
 
 
@@ -1,23 +1,205 @@
+-- pg_trgm provides the trigram operator classes used by the search text indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Index 1: Quickly find all bookings for a given customer (used in trigger & views)
+-- (HotelID, BookingID: also the bookings page sorted by customer name, walked customer by customer)
 DROP INDEX IF EXISTS idx_booking_customer;
-CREATE INDEX idx_booking_customer ON Booking(CustomerID);
+CREATE INDEX idx_booking_customer ON Booking(CustomerID, HotelID, BookingID);
 
 -- Index 2: Speed up room status filtering (e.g., 'Available', 'Occupied') for views & triggers
+-- (RoomID last: also the rooms page sorted by status for one hotel)
 DROP INDEX IF EXISTS idx_room_status;
-CREATE INDEX idx_room_status ON Room(HotelID, Status);
+CREATE INDEX idx_room_status ON Room(HotelID, Status, RoomID);
 
 -- Index 3: Optimize booking cancellation trigger (checks proximity to CheckInDate)
+-- (BookingID last: also the bookings page sorted by check-in date)
 DROP INDEX IF EXISTS idx_booking_checkin;
-CREATE INDEX idx_booking_checkin ON Booking(CheckInDate);
+CREATE INDEX idx_booking_checkin ON Booking(CheckInDate, BookingID);
 
 -- Index 4: Speed up finding unresolved room problems (used in Trigger 1)
 DROP INDEX IF EXISTS idx_room_problems;
 CREATE INDEX idx_room_problems ON RoomProblems(HotelID, RoomID, Resolved);
 
--- Index 5: Help with hotel filtering/grouping by address (used in views per area)
+-- Index 5: Trigram index for room search area filters (ILIKE '%x%' and typo-tolerant <%)
+-- A btree on Address cannot serve a leading-wildcard pattern
 DROP INDEX IF EXISTS idx_hotel_address;
-CREATE INDEX idx_hotel_address ON Hotel(Address);
+CREATE INDEX idx_hotel_address ON Hotel USING gin (Address gin_trgm_ops);
 
 -- Index 6: Speed up employee filtering by hotel and position
+-- (EmployeeID last: also the employees page sorted by position for one hotel)
 DROP INDEX IF EXISTS idx_employee_hotel_position;
-CREATE INDEX idx_employee_hotel_position ON Employee(HotelID, Position);
+CREATE INDEX idx_employee_hotel_position ON Employee(HotelID, Position, EmployeeID);
+
+-- Index 7: Chain renames update every RoomSearch row of the chain
+DROP INDEX IF EXISTS idx_room_search_chain;
+CREATE INDEX idx_room_search_chain ON RoomSearch(HotelChainID);
+
+-- Index 8: Default room search order (cheapest available rooms first)
+DROP INDEX IF EXISTS idx_room_search_price;
+CREATE INDEX idx_room_search_price ON RoomSearch(Price, HotelID, RoomID) WHERE Status = 'Available';
+
+-- Index 9: Overlap probe of new bookings against every rental of the room (validate_booking)
+-- Active bookings and ongoing rentals are already covered by their exclusion constraints' GiST indexes
+DROP INDEX IF EXISTS idx_rental_room_stay;
+CREATE INDEX idx_rental_room_stay ON Rental USING gist (HotelID, RoomID, Stay);
+
+-- Index 10: Trigram index for room search chain filters
+DROP INDEX IF EXISTS idx_hotel_chain_name;
+CREATE INDEX idx_hotel_chain_name ON HotelChain USING gin (ChainName gin_trgm_ops);
+
+-- Index 11: Batched sweep of expired idempotency keys
+DROP INDEX IF EXISTS idx_idempotency_key_expires;
+CREATE INDEX idx_idempotency_key_expires ON IdempotencyKey(ExpiresAt);
+
+-- Index 12: Rental reconciler (`flask reconcile-rentals`) only scans rentals that are still Ongoing
+DROP INDEX IF EXISTS idx_rental_ongoing;
+CREATE INDEX idx_rental_ongoing ON Rental(CheckOutDate, CheckInDate) WHERE Status = 'Ongoing';
+
+-- Index 13: Archive pages, one index per sort option of order_map followed by the pager's tiebreaker:
+-- hotel-scoped for managers and receptionists, chain-wide for admins. The ArchiveDate range is
+-- applied by partition pruning. Created on the partitioned tables, so every yearly partition gets its own copy
+DROP INDEX IF EXISTS idx_booking_archive_hotel_archivedate;
+DROP INDEX IF EXISTS idx_booking_archive_hotel_bookingdate;
+DROP INDEX IF EXISTS idx_booking_archive_hotel_checkin;
+DROP INDEX IF EXISTS idx_booking_archive_hotel_customer;
+DROP INDEX IF EXISTS idx_booking_archive_hotel_hotelname;
+DROP INDEX IF EXISTS idx_booking_archive_archivedate;
+DROP INDEX IF EXISTS idx_booking_archive_bookingdate;
+DROP INDEX IF EXISTS idx_booking_archive_checkin;
+DROP INDEX IF EXISTS idx_booking_archive_customer;
+DROP INDEX IF EXISTS idx_booking_archive_hotelname;
+CREATE INDEX idx_booking_archive_hotel_archivedate ON BookingArchive(HotelID, ArchiveDate, BookingID);
+CREATE INDEX idx_booking_archive_hotel_bookingdate ON BookingArchive(HotelID, BookingDate, BookingID, ArchiveDate);
+CREATE INDEX idx_booking_archive_hotel_checkin ON BookingArchive(HotelID, CheckInDate, BookingID, ArchiveDate);
+CREATE INDEX idx_booking_archive_hotel_customer ON BookingArchive(HotelID, CustomerName, BookingID, ArchiveDate);
+CREATE INDEX idx_booking_archive_hotel_hotelname ON BookingArchive(HotelID, HotelName, BookingID, ArchiveDate);
+CREATE INDEX idx_booking_archive_archivedate ON BookingArchive(ArchiveDate, BookingID);
+CREATE INDEX idx_booking_archive_bookingdate ON BookingArchive(BookingDate, BookingID, ArchiveDate);
+CREATE INDEX idx_booking_archive_checkin ON BookingArchive(CheckInDate, BookingID, ArchiveDate);
+CREATE INDEX idx_booking_archive_customer ON BookingArchive(CustomerName, BookingID, ArchiveDate);
+CREATE INDEX idx_booking_archive_hotelname ON BookingArchive(HotelName, BookingID, ArchiveDate);
+
+DROP INDEX IF EXISTS idx_rental_archive_hotel_archivedate;
+DROP INDEX IF EXISTS idx_rental_archive_hotel_checkin;
+DROP INDEX IF EXISTS idx_rental_archive_hotel_customer;
+DROP INDEX IF EXISTS idx_rental_archive_hotel_hotelname;
+DROP INDEX IF EXISTS idx_rental_archive_hotel_employee;
+DROP INDEX IF EXISTS idx_rental_archive_archivedate;
+DROP INDEX IF EXISTS idx_rental_archive_checkin;
+DROP INDEX IF EXISTS idx_rental_archive_customer;
+DROP INDEX IF EXISTS idx_rental_archive_hotelname;
+DROP INDEX IF EXISTS idx_rental_archive_employee;
+CREATE INDEX idx_rental_archive_hotel_archivedate ON RentalArchive(HotelID, ArchiveDate, RentalID);
+CREATE INDEX idx_rental_archive_hotel_checkin ON RentalArchive(HotelID, CheckInDate, RentalID, ArchiveDate);
+CREATE INDEX idx_rental_archive_hotel_customer ON RentalArchive(HotelID, CustomerName, RentalID, ArchiveDate);
+CREATE INDEX idx_rental_archive_hotel_hotelname ON RentalArchive(HotelID, HotelName, RentalID, ArchiveDate);
+CREATE INDEX idx_rental_archive_hotel_employee ON RentalArchive(HotelID, COALESCE(EmployeeName, ''), RentalID, ArchiveDate);
+CREATE INDEX idx_rental_archive_archivedate ON RentalArchive(ArchiveDate, RentalID);
+CREATE INDEX idx_rental_archive_checkin ON RentalArchive(CheckInDate, RentalID, ArchiveDate);
+CREATE INDEX idx_rental_archive_customer ON RentalArchive(CustomerName, RentalID, ArchiveDate);
+CREATE INDEX idx_rental_archive_hotelname ON RentalArchive(HotelName, RentalID, ArchiveDate);
+CREATE INDEX idx_rental_archive_employee ON RentalArchive(COALESCE(EmployeeName, ''), RentalID, ArchiveDate);
+
+-- Index 14: History purge (`flask purge-history`) walks finished bookings and rentals by check-out date
+DROP INDEX IF EXISTS idx_booking_finished_checkout;
+DROP INDEX IF EXISTS idx_rental_completed_checkout;
+CREATE INDEX idx_booking_finished_checkout ON Booking(CheckOutDate) WHERE Status IN ('Cancelled', 'Checked-in');
+CREATE INDEX idx_rental_completed_checkout ON Rental(CheckOutDate) WHERE Status = 'Completed';
+
+-- Index 15: Employee listing pages (customers, employees, hotels, rooms, room problems, bookings, rentals).
+-- One index per sort option of the route's sort map, followed by the pager's tiebreaker (the table's key):
+-- hotel-scoped (HotelID first) for managers and receptionists, chain-wide for admins. A page then reads
+-- per_page rows in index order instead of sorting the whole table. Sorts by a joined customer or hotel name
+-- walk that table's name index, then the CustomerID or HotelID index here, but still sort each name's rows by
+-- the tiebreaker in memory (a nested loop keeps only its outer order). Sorts by the table's key, and the ones
+-- covered by Indexes 1, 2, 3 and 6, are not repeated. benchmarks/listing_plans.py checks the plans
+DROP INDEX IF EXISTS idx_customer_fullname;
+DROP INDEX IF EXISTS idx_customer_registered;
+DROP INDEX IF EXISTS idx_customer_idtype;
+CREATE INDEX idx_customer_fullname ON Customer(FullName, CustomerID);
+CREATE INDEX idx_customer_registered ON Customer(RegistrationDate, CustomerID);
+CREATE INDEX idx_customer_idtype ON Customer(IDType, CustomerID);
+
+DROP INDEX IF EXISTS idx_employee_hotel_id;
+DROP INDEX IF EXISTS idx_employee_hotel_name;
+DROP INDEX IF EXISTS idx_employee_hotel_address;
+DROP INDEX IF EXISTS idx_employee_hotel_ssn;
+DROP INDEX IF EXISTS idx_employee_name;
+DROP INDEX IF EXISTS idx_employee_address;
+DROP INDEX IF EXISTS idx_employee_position;
+DROP INDEX IF EXISTS idx_employee_ssn;
+DROP INDEX IF EXISTS idx_employee_hotel;
+CREATE INDEX idx_employee_hotel_id ON Employee(HotelID, EmployeeID);
+CREATE INDEX idx_employee_hotel_name ON Employee(HotelID, FullName, EmployeeID);
+CREATE INDEX idx_employee_hotel_address ON Employee(HotelID, Address, EmployeeID);
+CREATE INDEX idx_employee_hotel_ssn ON Employee(HotelID, SSN, EmployeeID);
+CREATE INDEX idx_employee_name ON Employee(FullName, EmployeeID);
+CREATE INDEX idx_employee_address ON Employee(Address, EmployeeID);
+CREATE INDEX idx_employee_position ON Employee(Position, EmployeeID);
+CREATE INDEX idx_employee_ssn ON Employee(SSN, EmployeeID);
+CREATE INDEX idx_employee_hotel ON Employee(COALESCE(HotelID, 0), EmployeeID);
+
+DROP INDEX IF EXISTS idx_hotel_name;
+DROP INDEX IF EXISTS idx_hotel_address_sort;
+DROP INDEX IF EXISTS idx_hotel_category;
+DROP INDEX IF EXISTS idx_hotel_num_rooms;
+DROP INDEX IF EXISTS idx_hotel_rating;
+CREATE INDEX idx_hotel_name ON Hotel(HotelName, HotelID);
+CREATE INDEX idx_hotel_address_sort ON Hotel(Address, HotelID);
+CREATE INDEX idx_hotel_category ON Hotel(Category, HotelID);
+CREATE INDEX idx_hotel_num_rooms ON Hotel(Num_Rooms, HotelID);
+CREATE INDEX idx_hotel_rating ON Hotel(Rating, HotelID);
+
+DROP INDEX IF EXISTS idx_room_hotel_price;
+DROP INDEX IF EXISTS idx_room_hotel_capacity;
+DROP INDEX IF EXISTS idx_room_hotel_viewtype;
+DROP INDEX IF EXISTS idx_room_roomid;
+DROP INDEX IF EXISTS idx_room_price;
+DROP INDEX IF EXISTS idx_room_capacity;
+DROP INDEX IF EXISTS idx_room_status_sort;
+DROP INDEX IF EXISTS idx_room_viewtype;
+CREATE INDEX idx_room_hotel_price ON Room(HotelID, Price, RoomID);
+CREATE INDEX idx_room_hotel_capacity ON Room(HotelID, (CASE Capacity WHEN 'single' THEN 1 WHEN 'double' THEN 2 WHEN 'triple' THEN 3 WHEN 'family' THEN 4 WHEN 'suite' THEN 5 ELSE 6 END), RoomID);
+CREATE INDEX idx_room_hotel_viewtype ON Room(HotelID, ViewType, RoomID);
+CREATE INDEX idx_room_roomid ON Room(RoomID, HotelID);
+CREATE INDEX idx_room_price ON Room(Price, HotelID, RoomID);
+CREATE INDEX idx_room_capacity ON Room((CASE Capacity WHEN 'single' THEN 1 WHEN 'double' THEN 2 WHEN 'triple' THEN 3 WHEN 'family' THEN 4 WHEN 'suite' THEN 5 ELSE 6 END), HotelID, RoomID);
+CREATE INDEX idx_room_status_sort ON Room(Status, HotelID, RoomID);
+CREATE INDEX idx_room_viewtype ON Room(ViewType, HotelID, RoomID);
+
+DROP INDEX IF EXISTS idx_room_problems_hotel_reported;
+DROP INDEX IF EXISTS idx_room_problems_hotel_resolved;
+DROP INDEX IF EXISTS idx_room_problems_reported;
+DROP INDEX IF EXISTS idx_room_problems_roomid;
+DROP INDEX IF EXISTS idx_room_problems_resolved;
+CREATE INDEX idx_room_problems_hotel_reported ON RoomProblems(HotelID, ReportDate, RoomID, Problem);
+CREATE INDEX idx_room_problems_hotel_resolved ON RoomProblems(HotelID, COALESCE(Resolved, FALSE), RoomID, Problem);
+CREATE INDEX idx_room_problems_reported ON RoomProblems(ReportDate, HotelID, RoomID, Problem);
+CREATE INDEX idx_room_problems_roomid ON RoomProblems(RoomID, HotelID, Problem);
+CREATE INDEX idx_room_problems_resolved ON RoomProblems(COALESCE(Resolved, FALSE), HotelID, RoomID, Problem);
+
+DROP INDEX IF EXISTS idx_booking_hotel_checkin;
+DROP INDEX IF EXISTS idx_booking_hotel_bookingdate;
+DROP INDEX IF EXISTS idx_booking_hotel_status;
+DROP INDEX IF EXISTS idx_booking_bookingdate;
+DROP INDEX IF EXISTS idx_booking_status;
+CREATE INDEX idx_booking_hotel_checkin ON Booking(HotelID, CheckInDate, BookingID);
+CREATE INDEX idx_booking_hotel_bookingdate ON Booking(HotelID, BookingDate, BookingID);
+CREATE INDEX idx_booking_hotel_status ON Booking(HotelID, Status, BookingID);
+CREATE INDEX idx_booking_bookingdate ON Booking(BookingDate, BookingID);
+CREATE INDEX idx_booking_status ON Booking(Status, BookingID);
+
+DROP INDEX IF EXISTS idx_rental_hotel_checkin;
+DROP INDEX IF EXISTS idx_rental_hotel_status;
+DROP INDEX IF EXISTS idx_rental_hotel_payment;
+DROP INDEX IF EXISTS idx_rental_checkin;
+DROP INDEX IF EXISTS idx_rental_status;
+DROP INDEX IF EXISTS idx_rental_payment;
+DROP INDEX IF EXISTS idx_rental_customer;
+CREATE INDEX idx_rental_hotel_checkin ON Rental(HotelID, CheckInDate, RentalID);
+CREATE INDEX idx_rental_hotel_status ON Rental(HotelID, Status, RentalID);
+CREATE INDEX idx_rental_hotel_payment ON Rental(HotelID, PaymentAmount, RentalID);
+CREATE INDEX idx_rental_checkin ON Rental(CheckInDate, RentalID);
+CREATE INDEX idx_rental_status ON Rental(Status, RentalID);
+CREATE INDEX idx_rental_payment ON Rental(PaymentAmount, RentalID);
+CREATE INDEX idx_rental_customer ON Rental(CustomerID, HotelID, RentalID);
@@ -119,6 +119,7 @@ CREATE TABLE Booking (
     CheckInDate DATE NOT NULL,
     CheckOutDate DATE NOT NULL,
     Status VARCHAR(20) NOT NULL,
+    Stay DATERANGE GENERATED ALWAYS AS (daterange(CheckInDate, CheckOutDate, '[)')) STORED,
     FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE CASCADE,
     FOREIGN KEY (HotelID, RoomID) REFERENCES Room(HotelID, RoomID) ON DELETE CASCADE
 );
@@ -137,28 +138,77 @@ CREATE TABLE Rental (
     PaymentAmount DECIMAL(10, 2) NOT NULL,
     PaymentDate DATE NOT NULL,
     PaymentMethod VARCHAR(50) NOT NULL,
+    Stay DATERANGE GENERATED ALWAYS AS (daterange(CheckInDate, CheckOutDate, '[)')) STORED,
     FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE CASCADE,
     FOREIGN KEY (HotelID, RoomID) REFERENCES Room(HotelID, RoomID) ON DELETE CASCADE,
     FOREIGN KEY (EmployeeID) REFERENCES Employee(EmployeeID) ON DELETE SET NULL,
     FOREIGN KEY (BookingID) REFERENCES Booking(BookingID) ON DELETE SET NULL
 );
 
+-- Room Search projection (one row per room with its hotel, chain, amenity and problem fields, maintained by triggers)
+CREATE TABLE RoomSearch (
+    HotelID INTEGER NOT NULL,
+    RoomID INTEGER NOT NULL,
+    Price DECIMAL(10, 2) NOT NULL,
+    Capacity VARCHAR(20) NOT NULL,
+    CapacityRank INTEGER NOT NULL,
+    ViewType VARCHAR(20) NOT NULL,
+    Extendable BOOLEAN NOT NULL,
+    Status VARCHAR(20) NOT NULL,
+    HotelChainID INTEGER NOT NULL,
+    HotelName VARCHAR(255) NOT NULL,
+    Address VARCHAR(255) NOT NULL,
+    Category VARCHAR(50) NOT NULL,
+    Rating INTEGER NOT NULL,
+    Num_Rooms INTEGER NOT NULL,
+    ChainName VARCHAR(255) NOT NULL,
+    Amenities TEXT,
+    AmenityCount INTEGER NOT NULL DEFAULT 0,
+    ProblemCause VARCHAR(255),
+    PRIMARY KEY (HotelID, RoomID),
+    FOREIGN KEY (HotelID, RoomID) REFERENCES Room(HotelID, RoomID) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Room Calendar (one row per occupied room-night, maintained by triggers)
+CREATE TABLE RoomCalendar (
+    HotelID INTEGER NOT NULL,
+    RoomID INTEGER NOT NULL,
+    Night DATE NOT NULL,
+    Occupancy INTEGER NOT NULL,
+    PRIMARY KEY (HotelID, RoomID, Night),
+    FOREIGN KEY (HotelID, RoomID) REFERENCES Room(HotelID, RoomID) ON DELETE CASCADE
+);
+
+-- Customer Active Bookings (Pending or Checked-in bookings per customer, maintained by triggers)
+CREATE TABLE CustomerActiveBookings (
+    CustomerID INTEGER PRIMARY KEY,
+    ActiveBookings INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE CASCADE
+);
+
 -- Booking Archive Table
+-- Range-partitioned by ArchiveDate: one partition per year (create_archive_partitions() in triggers.sql,
+-- `flask create-archive-partitions`) and a default partition for dates no yearly partition covers
 CREATE TABLE BookingArchive (
-    BookingID INTEGER PRIMARY KEY,
+    BookingID INTEGER NOT NULL,
+    HotelID INTEGER NOT NULL,                 -- no foreign key: archives outlive deleted hotels
     CustomerName VARCHAR(100) NOT NULL,
-    HotelName VARCHAR(100) NOT NULL,
+    HotelName VARCHAR(100) NOT NULL,          -- hotel name when the booking was archived
     RoomIdentifier VARCHAR(20) NOT NULL,
     BookingDate DATE NOT NULL,
     CheckInDate DATE NOT NULL,
     CheckOutDate DATE NOT NULL,
     Status VARCHAR(20) NOT NULL,
-    ArchiveDate DATE NOT NULL DEFAULT CURRENT_DATE
-);
+    ArchiveDate DATE NOT NULL DEFAULT CURRENT_DATE,
+    PRIMARY KEY (BookingID, ArchiveDate)
+) PARTITION BY RANGE (ArchiveDate);
+
+CREATE TABLE BookingArchive_Default PARTITION OF BookingArchive DEFAULT;
 
--- Rental Archive Table
+-- Rental Archive Table (partitioned like BookingArchive)
 CREATE TABLE RentalArchive (
-    RentalID INTEGER PRIMARY KEY,
+    RentalID INTEGER NOT NULL,
+    HotelID INTEGER NOT NULL,
     CustomerName VARCHAR(100) NOT NULL,
     HotelName VARCHAR(100) NOT NULL,
     RoomIdentifier VARCHAR(20) NOT NULL,
@@ -170,5 +220,23 @@ CREATE TABLE RentalArchive (
     PaymentAmount DECIMAL(10, 2) NOT NULL,
     PaymentDate DATE,
     PaymentMethod VARCHAR(50),
-    ArchiveDate DATE NOT NULL DEFAULT CURRENT_DATE
+    ArchiveDate DATE NOT NULL DEFAULT CURRENT_DATE,
+    PRIMARY KEY (RentalID, ArchiveDate)
+) PARTITION BY RANGE (ArchiveDate);
+
+CREATE TABLE RentalArchive_Default PARTITION OF RentalArchive DEFAULT;
+
+-- Idempotency Keys (stored responses of booking, rental and payment POSTs, replayed on client retries)
+CREATE TABLE IdempotencyKey (
+    Scope VARCHAR(100) NOT NULL,              -- user and endpoint the key was sent to
+    IdempotencyKey VARCHAR(100) NOT NULL,
+    RequestHash CHAR(64) NOT NULL,            -- SHA-256 of the form, so a reused key cannot replay another request
+    StatusCode INTEGER,                       -- NULL while the first request is still running
+    Location TEXT,
+    ContentType VARCHAR(100),
+    Body BYTEA,
+    Flashes JSONB,
+    CreatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ExpiresAt TIMESTAMP NOT NULL,
+    PRIMARY KEY (Scope, IdempotencyKey)
 );
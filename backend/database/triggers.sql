@@ -1,52 +1,95 @@
--- Trigger 1: Prevent booking a room with unresolved problems
+-- Trigger 1: Validate a new booking in one pass (replaces the former Trigger 1, Trigger 2 and overlap trigger)
+-- Checks, in the order the separate triggers used to fire: max 5 active bookings per customer,
+-- no overlapping booking or rental, no unresolved problems on the room
 DROP TRIGGER IF EXISTS trg_prevent_problematic_booking ON Booking;
-DROP FUNCTION IF EXISTS prevent_problematic_booking CASCADE;
-
-CREATE OR REPLACE FUNCTION prevent_problematic_booking() RETURNS TRIGGER AS $$
-BEGIN
-    IF EXISTS (
-        SELECT 1
-        FROM RoomProblems
-        WHERE HotelID = NEW.HotelID
-          AND RoomID = NEW.RoomID
-          AND Resolved = FALSE
-    ) THEN
-        RAISE EXCEPTION '⛔ Cannot book room with unresolved problems.';
-    END IF;
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
-CREATE TRIGGER trg_prevent_problematic_booking
-BEFORE INSERT ON Booking
-FOR EACH ROW
-EXECUTE FUNCTION prevent_problematic_booking();
-
--- Trigger 2: Enforce max 5 active bookings per customer
 DROP TRIGGER IF EXISTS trg_limit_active_bookings ON Booking;
+DROP TRIGGER IF EXISTS trg_prevent_overlapping_booking ON Booking;
+DROP TRIGGER IF EXISTS trg_validate_booking ON Booking;
+DROP FUNCTION IF EXISTS prevent_problematic_booking CASCADE;
 DROP FUNCTION IF EXISTS limit_active_bookings CASCADE;
+DROP FUNCTION IF EXISTS prevent_overlapping_booking CASCADE;
+DROP FUNCTION IF EXISTS validate_booking CASCADE;
 
-CREATE OR REPLACE FUNCTION limit_active_bookings() RETURNS TRIGGER AS $$
+CREATE OR REPLACE FUNCTION validate_booking() RETURNS TRIGGER AS $$
 DECLARE
     active_bookings_count INTEGER;
+    has_overlap BOOLEAN;
+    has_problems BOOLEAN;
 BEGIN
-    SELECT COUNT(*) INTO active_bookings_count
-    FROM Booking
+    -- Room first, then customer: concurrent bookings of the same room (or by the same customer)
+    -- queue here instead of both passing the checks. The room lock is the one the AFTER INSERT
+    -- room status update needs anyway; NO KEY UPDATE leaves foreign key checks unblocked.
+    PERFORM 1 FROM Room
+    WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
+    FOR NO KEY UPDATE;
+
+    -- The customer's counter row doubles as the customer lock
+    SELECT ActiveBookings INTO active_bookings_count
+    FROM CustomerActiveBookings
     WHERE CustomerID = NEW.CustomerID
-      AND Status IN ('Pending', 'Checked-in');
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        INSERT INTO CustomerActiveBookings (CustomerID, ActiveBookings)
+        VALUES (NEW.CustomerID, 0)
+        ON CONFLICT (CustomerID) DO NOTHING;
+
+        SELECT ActiveBookings INTO active_bookings_count
+        FROM CustomerActiveBookings
+        WHERE CustomerID = NEW.CustomerID
+        FOR UPDATE;
+    END IF;
+
+    -- Remaining probes in one statement; generated columns are not computed yet in BEFORE triggers,
+    -- so the stay range is built from NEW
+    SELECT
+        EXISTS (
+            SELECT 1 FROM Booking
+            WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
+              AND Status IN ('Pending', 'Checked-in')
+              AND Stay && daterange(NEW.CheckInDate, NEW.CheckOutDate, '[)')
+        ) OR EXISTS (
+            SELECT 1 FROM Rental
+            WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
+              AND Stay && daterange(NEW.CheckInDate, NEW.CheckOutDate, '[)')
+        ),
+        EXISTS (
+            SELECT 1
+            FROM RoomProblems
+            WHERE HotelID = NEW.HotelID
+              AND RoomID = NEW.RoomID
+              AND Resolved = FALSE
+        )
+    INTO has_overlap, has_problems;
 
     IF active_bookings_count >= 5 THEN
         RAISE EXCEPTION '❌ Customer already has 5 or more active bookings.';
     END IF;
 
+    IF has_overlap THEN
+        RAISE EXCEPTION '⛔ Cannot book: Room already booked or rented for selected dates.';
+    END IF;
+
+    IF has_problems THEN
+        RAISE EXCEPTION '⛔ Cannot book room with unresolved problems.';
+    END IF;
+
+    -- Counted here rather than AFTER INSERT: AFTER row triggers run at the end of the statement,
+    -- and later rows of a multi-row insert must see this one
+    IF NEW.Status IN ('Pending', 'Checked-in') THEN
+        UPDATE CustomerActiveBookings
+        SET ActiveBookings = ActiveBookings + 1
+        WHERE CustomerID = NEW.CustomerID;
+    END IF;
+
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trg_limit_active_bookings
+CREATE TRIGGER trg_validate_booking
 BEFORE INSERT ON Booking
 FOR EACH ROW
-EXECUTE FUNCTION limit_active_bookings();
+EXECUTE FUNCTION validate_booking();
 
 -- Trigger 3: Prevent cancellation on the day of check-in
 DROP TRIGGER IF EXISTS trg_prevent_late_cancellation ON Booking;
@@ -75,94 +118,80 @@ BEFORE UPDATE ON Booking
 FOR EACH ROW
 EXECUTE FUNCTION prevent_late_cancellation();
 
--- Trigger 4: Archive booking before deletion
+-- Trigger 4: Archive deleted bookings
+-- Statement-level with a transition table: a DELETE of any size archives its rows with one joined
+-- INSERT ... SELECT instead of per-row lookups (bookings whose customer is already gone are not archived)
 DROP TRIGGER IF EXISTS trg_archive_booking ON Booking;
 DROP FUNCTION IF EXISTS archive_booking CASCADE;
 
 CREATE OR REPLACE FUNCTION archive_booking() RETURNS TRIGGER AS $$
-DECLARE
-    hotel_name TEXT;
-    room_code TEXT;
 BEGIN
-    SELECT HotelName INTO hotel_name
-    FROM Hotel WHERE HotelID = OLD.HotelID;
-
-    room_code := 'Room ' || OLD.RoomID;
-
     INSERT INTO BookingArchive (
-        BookingID, CustomerName, HotelName, RoomIdentifier, 
+        BookingID, HotelID, CustomerName, HotelName, RoomIdentifier, 
         BookingDate, CheckInDate, CheckOutDate, Status
     )
     SELECT
-        OLD.BookingID,
+        o.BookingID,
+        o.HotelID,
         c.FullName,
-        hotel_name,
-        room_code,
-        OLD.BookingDate,
-        OLD.CheckInDate,
-        OLD.CheckOutDate,
-        OLD.Status
-    FROM Customer c
-    WHERE c.CustomerID = OLD.CustomerID;
-
-    RETURN OLD;
+        h.HotelName,
+        'Room ' || o.RoomID,
+        o.BookingDate,
+        o.CheckInDate,
+        o.CheckOutDate,
+        o.Status
+    FROM deleted_bookings o
+    JOIN Customer c ON c.CustomerID = o.CustomerID
+    LEFT JOIN Hotel h ON h.HotelID = o.HotelID;
+
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trg_archive_booking
-BEFORE DELETE ON Booking
-FOR EACH ROW
+AFTER DELETE ON Booking
+REFERENCING OLD TABLE AS deleted_bookings
+FOR EACH STATEMENT
 EXECUTE FUNCTION archive_booking();
 
--- Trigger 5: Archive rental before deletion
+-- Trigger 5: Archive deleted rentals (statement-level, like Trigger 4)
 DROP TRIGGER IF EXISTS trg_archive_rental ON Rental;
 DROP FUNCTION IF EXISTS archive_rental CASCADE;
 
 CREATE OR REPLACE FUNCTION archive_rental() RETURNS TRIGGER AS $$
-DECLARE
-    hotel_name TEXT;
-    employee_name TEXT;
-    customer_name TEXT;
-    room_code TEXT;
 BEGIN
-    SELECT HotelName INTO hotel_name
-    FROM Hotel WHERE HotelID = OLD.HotelID;
-
-    SELECT FullName INTO employee_name
-    FROM Employee WHERE EmployeeID = OLD.EmployeeID;
-
-    SELECT FullName INTO customer_name
-    FROM Customer WHERE CustomerID = OLD.CustomerID;
-
-    room_code := 'Room ' || OLD.RoomID;
-
     INSERT INTO RentalArchive (
-        RentalID, CustomerName, HotelName, RoomIdentifier, 
+        RentalID, HotelID, CustomerName, HotelName, RoomIdentifier, 
         EmployeeName, BookingID, CheckInDate, CheckOutDate, 
         Status, PaymentAmount, PaymentDate, PaymentMethod
     )
-    VALUES (
-        OLD.RentalID,
-        customer_name,
-        hotel_name,
-        room_code,
-        employee_name,
-        OLD.BookingID,
-        OLD.CheckInDate,
-        OLD.CheckOutDate,
-        OLD.Status,
-        OLD.PaymentAmount,
-        OLD.PaymentDate,
-        OLD.PaymentMethod
-    );
-
-    RETURN OLD;
+    SELECT
+        o.RentalID,
+        o.HotelID,
+        c.FullName,
+        h.HotelName,
+        'Room ' || o.RoomID,
+        e.FullName,
+        o.BookingID,
+        o.CheckInDate,
+        o.CheckOutDate,
+        o.Status,
+        o.PaymentAmount,
+        o.PaymentDate,
+        o.PaymentMethod
+    FROM deleted_rentals o
+    LEFT JOIN Customer c ON c.CustomerID = o.CustomerID
+    LEFT JOIN Hotel h ON h.HotelID = o.HotelID
+    LEFT JOIN Employee e ON e.EmployeeID = o.EmployeeID;
+
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trg_archive_rental
-BEFORE DELETE ON Rental
-FOR EACH ROW
+AFTER DELETE ON Rental
+REFERENCING OLD TABLE AS deleted_rentals
+FOR EACH STATEMENT
 EXECUTE FUNCTION archive_rental();
 
 -- Trigger 6: Adjust room status based on booking updates (Checked-in → Occupied, Cancelled → Available)
@@ -427,60 +456,29 @@ BEFORE INSERT ON RoomProblems
 FOR EACH ROW
 EXECUTE FUNCTION restrict_problem_reporting();
 
--- Trigger function to prevent inserting a booking that overlaps with an existing booking or rental
-DROP TRIGGER IF EXISTS trg_prevent_overlapping_booking ON Booking;
-DROP FUNCTION IF EXISTS prevent_overlapping_booking CASCADE;
-
-CREATE OR REPLACE FUNCTION prevent_overlapping_booking() RETURNS TRIGGER AS $$
-BEGIN
-    IF EXISTS (
-        SELECT 1 FROM Booking
-        WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
-          AND Status IN ('Pending', 'Checked-in')
-          AND (
-              NEW.CheckInDate < CheckOutDate AND NEW.CheckOutDate > CheckInDate
-          )
-    ) OR EXISTS (
-        SELECT 1 FROM Rental
-        WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
-          AND (
-              NEW.CheckInDate < CheckOutDate AND NEW.CheckOutDate > CheckInDate
-          )
-    ) THEN
-        RAISE EXCEPTION '⛔ Cannot book: Room already booked or rented for selected dates.';
-    END IF;
-
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
-CREATE TRIGGER trg_prevent_overlapping_booking
-BEFORE INSERT ON Booking
-FOR EACH ROW
-EXECUTE FUNCTION prevent_overlapping_booking();
-
 -- Trigger function to prevent inserting a rental that overlaps with an existing booking or ongoing rental
 DROP TRIGGER IF EXISTS trg_prevent_overlapping_rental ON Rental;
 DROP FUNCTION IF EXISTS prevent_overlapping_rental CASCADE;
 
 CREATE OR REPLACE FUNCTION prevent_overlapping_rental() RETURNS TRIGGER AS $$
 BEGIN
+    -- Same room lock as validate_booking, so a rental and a booking of one room cannot both pass
+    PERFORM 1 FROM Room
+    WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
+    FOR NO KEY UPDATE;
+
     -- Check for overlapping bookings, excluding the current one if provided
     IF EXISTS (
         SELECT 1 FROM Booking
         WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
           AND Status IN ('Pending', 'Checked-in')
-          AND (
-              NEW.CheckInDate < CheckOutDate AND NEW.CheckOutDate > CheckInDate
-          )
+          AND Stay && daterange(NEW.CheckInDate, NEW.CheckOutDate, '[)')
           AND (BookingID IS DISTINCT FROM NEW.BookingID)  -- Exclude the one being converted
     ) OR EXISTS (
         SELECT 1 FROM Rental
         WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID
           AND Status = 'Ongoing'
-          AND (
-              NEW.CheckInDate < CheckOutDate AND NEW.CheckOutDate > CheckInDate
-          )
+          AND Stay && daterange(NEW.CheckInDate, NEW.CheckOutDate, '[)')
     ) THEN
         RAISE EXCEPTION '⛔ Cannot rent: Room already booked or rented for selected dates.';
     END IF;
@@ -493,3 +491,442 @@ CREATE TRIGGER trg_prevent_overlapping_rental
 BEFORE INSERT ON Rental
 FOR EACH ROW
 EXECUTE FUNCTION prevent_overlapping_rental();
+
+-- Trigger function to keep the per-night room calendar in sync with bookings and rentals
+-- Active bookings (Pending, Checked-in) and all rentals occupy every night in [CheckInDate, CheckOutDate)
+DROP TRIGGER IF EXISTS trg_room_calendar_booking ON Booking;
+DROP TRIGGER IF EXISTS trg_room_calendar_rental ON Rental;
+DROP FUNCTION IF EXISTS sync_room_calendar CASCADE;
+DROP FUNCTION IF EXISTS adjust_room_calendar CASCADE;
+DROP FUNCTION IF EXISTS rebuild_room_calendar CASCADE;
+
+CREATE OR REPLACE FUNCTION adjust_room_calendar(
+    p_hotel_id INTEGER,
+    p_room_id INTEGER,
+    p_checkin DATE,
+    p_checkout DATE,
+    p_delta INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    IF p_delta > 0 THEN
+        INSERT INTO RoomCalendar (HotelID, RoomID, Night, Occupancy)
+        SELECT p_hotel_id, p_room_id, n::DATE, p_delta
+        FROM generate_series(p_checkin::TIMESTAMP, (p_checkout - 1)::TIMESTAMP, INTERVAL '1 day') AS n
+        ON CONFLICT (HotelID, RoomID, Night)
+        DO UPDATE SET Occupancy = RoomCalendar.Occupancy + EXCLUDED.Occupancy;
+    ELSE
+        UPDATE RoomCalendar
+        SET Occupancy = Occupancy + p_delta
+        WHERE HotelID = p_hotel_id AND RoomID = p_room_id
+          AND Night >= p_checkin AND Night < p_checkout;
+
+        DELETE FROM RoomCalendar
+        WHERE HotelID = p_hotel_id AND RoomID = p_room_id
+          AND Night >= p_checkin AND Night < p_checkout
+          AND Occupancy <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_room_calendar() RETURNS TRIGGER AS $$
+DECLARE
+    old_active BOOLEAN := FALSE;
+    new_active BOOLEAN := FALSE;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_active := TG_TABLE_NAME = 'rental' OR OLD.Status IN ('Pending', 'Checked-in');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_active := TG_TABLE_NAME = 'rental' OR NEW.Status IN ('Pending', 'Checked-in');
+    END IF;
+
+    -- Status changes between two active (or two inactive) states leave the calendar untouched
+    IF TG_OP = 'UPDATE'
+       AND old_active = new_active
+       AND OLD.HotelID = NEW.HotelID AND OLD.RoomID = NEW.RoomID
+       AND OLD.CheckInDate = NEW.CheckInDate AND OLD.CheckOutDate = NEW.CheckOutDate THEN
+        RETURN NULL;
+    END IF;
+
+    IF old_active THEN
+        PERFORM adjust_room_calendar(OLD.HotelID, OLD.RoomID, OLD.CheckInDate, OLD.CheckOutDate, -1);
+    END IF;
+    IF new_active THEN
+        PERFORM adjust_room_calendar(NEW.HotelID, NEW.RoomID, NEW.CheckInDate, NEW.CheckOutDate, 1);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_room_calendar_booking
+AFTER INSERT OR UPDATE OR DELETE ON Booking
+FOR EACH ROW
+EXECUTE FUNCTION sync_room_calendar();
+
+CREATE TRIGGER trg_room_calendar_rental
+AFTER INSERT OR UPDATE OR DELETE ON Rental
+FOR EACH ROW
+EXECUTE FUNCTION sync_room_calendar();
+
+-- Rebuild the whole calendar from Booking and Rental (rows loaded by populate.sql predate the triggers)
+CREATE OR REPLACE FUNCTION rebuild_room_calendar() RETURNS VOID AS $$
+BEGIN
+    DELETE FROM RoomCalendar;
+
+    INSERT INTO RoomCalendar (HotelID, RoomID, Night, Occupancy)
+    SELECT s.HotelID, s.RoomID, n::DATE, COUNT(*)
+    FROM (
+        SELECT HotelID, RoomID, CheckInDate, CheckOutDate
+        FROM Booking
+        WHERE Status IN ('Pending', 'Checked-in')
+        UNION ALL
+        SELECT HotelID, RoomID, CheckInDate, CheckOutDate
+        FROM Rental
+    ) s
+    CROSS JOIN LATERAL generate_series(s.CheckInDate::TIMESTAMP, (s.CheckOutDate - 1)::TIMESTAMP, INTERVAL '1 day') AS n
+    GROUP BY s.HotelID, s.RoomID, n::DATE;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_room_calendar();
+
+-- Trigger functions to keep the RoomSearch projection in sync with Room, RoomAmenities, RoomProblems, Hotel and HotelChain
+DROP TRIGGER IF EXISTS trg_room_search_room ON Room;
+DROP TRIGGER IF EXISTS trg_room_search_amenities ON RoomAmenities;
+DROP TRIGGER IF EXISTS trg_room_search_problems ON RoomProblems;
+DROP TRIGGER IF EXISTS trg_room_search_hotel ON Hotel;
+DROP TRIGGER IF EXISTS trg_room_search_chain ON HotelChain;
+DROP FUNCTION IF EXISTS capacity_rank CASCADE;
+DROP FUNCTION IF EXISTS room_search_rows CASCADE;
+DROP FUNCTION IF EXISTS refresh_room_search CASCADE;
+DROP FUNCTION IF EXISTS refresh_room_search_amenities CASCADE;
+DROP FUNCTION IF EXISTS refresh_room_search_problem CASCADE;
+DROP FUNCTION IF EXISTS rebuild_room_search CASCADE;
+DROP FUNCTION IF EXISTS sync_room_search_room CASCADE;
+DROP FUNCTION IF EXISTS sync_room_search_amenities CASCADE;
+DROP FUNCTION IF EXISTS sync_room_search_problems CASCADE;
+DROP FUNCTION IF EXISTS sync_room_search_hotel CASCADE;
+DROP FUNCTION IF EXISTS sync_room_search_chain CASCADE;
+
+-- Capacity ordering used by the capacity sort options (single = 1 ... suite = 5)
+CREATE OR REPLACE FUNCTION capacity_rank(p_capacity VARCHAR) RETURNS INTEGER AS $$
+    SELECT CASE p_capacity
+        WHEN 'single' THEN 1
+        WHEN 'double' THEN 2
+        WHEN 'triple' THEN 3
+        WHEN 'family' THEN 4
+        WHEN 'suite' THEN 5
+        ELSE 6
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Full projection rows; inlined by the planner, so callers can filter it by room
+CREATE OR REPLACE FUNCTION room_search_rows() RETURNS SETOF RoomSearch AS $$
+    SELECT
+        r.HotelID,
+        r.RoomID,
+        r.Price,
+        r.Capacity,
+        capacity_rank(r.Capacity),
+        r.ViewType,
+        r.Extendable,
+        r.Status,
+        h.HotelChainID,
+        h.HotelName,
+        h.Address,
+        h.Category,
+        h.Rating,
+        h.Num_Rooms,
+        hc.ChainName,
+        (
+            SELECT string_agg(ra.Amenity, ', ' ORDER BY ra.Amenity)
+            FROM RoomAmenities ra
+            WHERE ra.HotelID = r.HotelID AND ra.RoomID = r.RoomID
+        ),
+        (
+            SELECT COUNT(*)::INTEGER
+            FROM RoomAmenities ra
+            WHERE ra.HotelID = r.HotelID AND ra.RoomID = r.RoomID
+        ),
+        (
+            SELECT p.Problem
+            FROM RoomProblems p
+            WHERE p.HotelID = r.HotelID AND p.RoomID = r.RoomID AND p.Resolved = FALSE
+            ORDER BY p.ReportDate DESC
+            LIMIT 1
+        )
+    FROM Room r
+    JOIN Hotel h ON r.HotelID = h.HotelID
+    JOIN HotelChain hc ON h.HotelChainID = hc.HotelChainID;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION refresh_room_search(p_hotel_id INTEGER, p_room_id INTEGER) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO RoomSearch
+    SELECT * FROM room_search_rows() rs
+    WHERE rs.HotelID = p_hotel_id AND rs.RoomID = p_room_id
+    ON CONFLICT (HotelID, RoomID) DO UPDATE SET
+        Price = EXCLUDED.Price,
+        Capacity = EXCLUDED.Capacity,
+        CapacityRank = EXCLUDED.CapacityRank,
+        ViewType = EXCLUDED.ViewType,
+        Extendable = EXCLUDED.Extendable,
+        Status = EXCLUDED.Status,
+        HotelChainID = EXCLUDED.HotelChainID,
+        HotelName = EXCLUDED.HotelName,
+        Address = EXCLUDED.Address,
+        Category = EXCLUDED.Category,
+        Rating = EXCLUDED.Rating,
+        Num_Rooms = EXCLUDED.Num_Rooms,
+        ChainName = EXCLUDED.ChainName,
+        Amenities = EXCLUDED.Amenities,
+        AmenityCount = EXCLUDED.AmenityCount,
+        ProblemCause = EXCLUDED.ProblemCause;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_room_search_amenities(p_hotel_id INTEGER, p_room_id INTEGER) RETURNS VOID AS $$
+BEGIN
+    UPDATE RoomSearch rs
+    SET Amenities = a.Amenities,
+        AmenityCount = a.AmenityCount
+    FROM (
+        SELECT string_agg(Amenity, ', ' ORDER BY Amenity) AS Amenities, COUNT(*)::INTEGER AS AmenityCount
+        FROM RoomAmenities
+        WHERE HotelID = p_hotel_id AND RoomID = p_room_id
+    ) a
+    WHERE rs.HotelID = p_hotel_id AND rs.RoomID = p_room_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_room_search_problem(p_hotel_id INTEGER, p_room_id INTEGER) RETURNS VOID AS $$
+BEGIN
+    UPDATE RoomSearch
+    SET ProblemCause = (
+        SELECT Problem
+        FROM RoomProblems
+        WHERE HotelID = p_hotel_id AND RoomID = p_room_id AND Resolved = FALSE
+        ORDER BY ReportDate DESC
+        LIMIT 1
+    )
+    WHERE HotelID = p_hotel_id AND RoomID = p_room_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_room_search_room() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM RoomSearch WHERE HotelID = OLD.HotelID AND RoomID = OLD.RoomID;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM refresh_room_search(NEW.HotelID, NEW.RoomID);
+    ELSIF OLD.HotelID <> NEW.HotelID OR OLD.RoomID <> NEW.RoomID THEN
+        -- Room moved to another key: its hotel, amenity and problem fields may all differ
+        DELETE FROM RoomSearch WHERE HotelID = OLD.HotelID AND RoomID = OLD.RoomID;
+        PERFORM refresh_room_search(NEW.HotelID, NEW.RoomID);
+    ELSE
+        UPDATE RoomSearch
+        SET Price = NEW.Price,
+            Capacity = NEW.Capacity,
+            CapacityRank = capacity_rank(NEW.Capacity),
+            ViewType = NEW.ViewType,
+            Extendable = NEW.Extendable,
+            Status = NEW.Status
+        WHERE HotelID = NEW.HotelID AND RoomID = NEW.RoomID;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_room_search_room
+AFTER INSERT OR UPDATE OR DELETE ON Room
+FOR EACH ROW
+EXECUTE FUNCTION sync_room_search_room();
+
+CREATE OR REPLACE FUNCTION sync_room_search_amenities() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_room_search_amenities(OLD.HotelID, OLD.RoomID);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND (OLD.HotelID, OLD.RoomID) IS DISTINCT FROM (NEW.HotelID, NEW.RoomID)) THEN
+        PERFORM refresh_room_search_amenities(NEW.HotelID, NEW.RoomID);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_room_search_amenities
+AFTER INSERT OR UPDATE OR DELETE ON RoomAmenities
+FOR EACH ROW
+EXECUTE FUNCTION sync_room_search_amenities();
+
+CREATE OR REPLACE FUNCTION sync_room_search_problems() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_room_search_problem(OLD.HotelID, OLD.RoomID);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND (OLD.HotelID, OLD.RoomID) IS DISTINCT FROM (NEW.HotelID, NEW.RoomID)) THEN
+        PERFORM refresh_room_search_problem(NEW.HotelID, NEW.RoomID);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_room_search_problems
+AFTER INSERT OR UPDATE OR DELETE ON RoomProblems
+FOR EACH ROW
+EXECUTE FUNCTION sync_room_search_problems();
+
+CREATE OR REPLACE FUNCTION sync_room_search_hotel() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE RoomSearch rs
+    SET HotelChainID = NEW.HotelChainID,
+        HotelName = NEW.HotelName,
+        Address = NEW.Address,
+        Category = NEW.Category,
+        Rating = NEW.Rating,
+        Num_Rooms = NEW.Num_Rooms,
+        ChainName = hc.ChainName
+    FROM HotelChain hc
+    WHERE hc.HotelChainID = NEW.HotelChainID
+      AND rs.HotelID = NEW.HotelID;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_room_search_hotel
+AFTER UPDATE ON Hotel
+FOR EACH ROW
+WHEN (OLD.* IS DISTINCT FROM NEW.*)
+EXECUTE FUNCTION sync_room_search_hotel();
+
+CREATE OR REPLACE FUNCTION sync_room_search_chain() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE RoomSearch
+    SET ChainName = NEW.ChainName
+    WHERE HotelChainID = NEW.HotelChainID;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_room_search_chain
+AFTER UPDATE OF ChainName ON HotelChain
+FOR EACH ROW
+WHEN (OLD.ChainName IS DISTINCT FROM NEW.ChainName)
+EXECUTE FUNCTION sync_room_search_chain();
+
+-- Rebuild the whole projection (rows loaded by populate.sql predate the triggers)
+CREATE OR REPLACE FUNCTION rebuild_room_search() RETURNS VOID AS $$
+BEGIN
+    DELETE FROM RoomSearch;
+    INSERT INTO RoomSearch SELECT * FROM room_search_rows();
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_room_search();
+
+-- Trigger function to keep CustomerActiveBookings in sync with Booking status changes and deletes
+-- (inserts are counted by validate_booking)
+DROP TRIGGER IF EXISTS trg_active_booking_count ON Booking;
+DROP FUNCTION IF EXISTS maintain_active_booking_count CASCADE;
+DROP FUNCTION IF EXISTS repair_active_booking_counts CASCADE;
+
+CREATE OR REPLACE FUNCTION maintain_active_booking_count() RETURNS TRIGGER AS $$
+DECLARE
+    was_active BOOLEAN := OLD.Status IN ('Pending', 'Checked-in');
+    is_active BOOLEAN := TG_OP = 'UPDATE' AND NEW.Status IN ('Pending', 'Checked-in');
+BEGIN
+    IF TG_OP = 'UPDATE' AND was_active = is_active AND OLD.CustomerID = NEW.CustomerID THEN
+        RETURN NULL;
+    END IF;
+
+    -- Only decrement existing rows: when a customer is deleted, its bookings cascade after the customer
+    IF was_active THEN
+        UPDATE CustomerActiveBookings
+        SET ActiveBookings = ActiveBookings - 1
+        WHERE CustomerID = OLD.CustomerID;
+    END IF;
+
+    IF is_active THEN
+        INSERT INTO CustomerActiveBookings (CustomerID, ActiveBookings)
+        VALUES (NEW.CustomerID, 1)
+        ON CONFLICT (CustomerID)
+        DO UPDATE SET ActiveBookings = CustomerActiveBookings.ActiveBookings + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_active_booking_count
+AFTER UPDATE OR DELETE ON Booking
+FOR EACH ROW
+EXECUTE FUNCTION maintain_active_booking_count();
+
+-- Recompute every counter from Booking; returns the number of counters created or corrected.
+-- Booking is locked in SHARE mode so that no booking changes between the count and the write.
+CREATE OR REPLACE FUNCTION repair_active_booking_counts() RETURNS INTEGER AS $$
+DECLARE
+    repaired INTEGER;
+BEGIN
+    LOCK TABLE Booking IN SHARE MODE;
+
+    INSERT INTO CustomerActiveBookings (CustomerID, ActiveBookings)
+    SELECT c.CustomerID, COUNT(b.BookingID)
+    FROM Customer c
+    LEFT JOIN Booking b
+      ON b.CustomerID = c.CustomerID
+     AND b.Status IN ('Pending', 'Checked-in')
+    GROUP BY c.CustomerID
+    ON CONFLICT (CustomerID)
+    DO UPDATE SET ActiveBookings = EXCLUDED.ActiveBookings
+    WHERE CustomerActiveBookings.ActiveBookings <> EXCLUDED.ActiveBookings;
+
+    GET DIAGNOSTICS repaired = ROW_COUNT;
+    RETURN repaired;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill the counters for bookings loaded by populate.sql
+SELECT repair_active_booking_counts();
+
+-- Create the yearly BookingArchive and RentalArchive partitions for a year (no-op if they exist).
+-- Rows of that year already in the default partitions are moved into the new partitions.
+DROP FUNCTION IF EXISTS create_archive_partitions CASCADE;
+
+CREATE OR REPLACE FUNCTION create_archive_partitions(p_year INTEGER) RETURNS INTEGER AS $$
+DECLARE
+    archive TEXT;
+    partition_name TEXT;
+    range_start DATE := make_date(p_year, 1, 1);
+    range_end DATE := make_date(p_year + 1, 1, 1);
+    created INTEGER := 0;
+BEGIN
+    FOREACH archive IN ARRAY ARRAY['bookingarchive', 'rentalarchive'] LOOP
+        partition_name := archive || '_' || p_year;
+        CONTINUE WHEN to_regclass(partition_name) IS NOT NULL;
+
+        -- Build the partition detached, move the year's rows out of the default partition, then attach
+        -- (attaching scans the default partition to check none of its rows belong to the new range)
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name, archive);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE ArchiveDate >= %L AND ArchiveDate < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            archive || '_default', range_start, range_end, partition_name
+        );
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       archive, partition_name, range_start, range_end);
+        created := created + 1;
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_archive_partitions(year)
+FROM generate_series(EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER - 1, EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER + 1) AS year;
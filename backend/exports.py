@@ -0,0 +1,95 @@
+import csv
+import io
+from sqlalchemy import text
+from app import db
+
+# Rows fetched from the server-side cursor (and written to the response) at a time
+ROWS_PER_CHUNK = 1000
+
+# kind -> (query, hotel column, column the date range applies to, unique column for a stable order).
+# Archives are filtered on ArchiveDate so only the matching yearly partitions are read.
+EXPORTS = {
+    'bookings': ("""
+        SELECT b.BookingID, b.HotelID, h.HotelName, b.RoomID, b.CustomerID, c.FullName AS CustomerName,
+               b.BookingDate, b.CheckInDate, b.CheckOutDate, b.Status
+        FROM Booking b
+        JOIN Customer c ON c.CustomerID = b.CustomerID
+        JOIN Hotel h ON h.HotelID = b.HotelID
+    """, 'b.HotelID', 'b.CheckInDate', 'b.BookingID'),
+    'rentals': ("""
+        SELECT r.RentalID, r.HotelID, h.HotelName, r.RoomID, r.CustomerID, c.FullName AS CustomerName,
+               r.EmployeeID, e.FullName AS EmployeeName, r.BookingID, r.CheckInDate, r.CheckOutDate,
+               r.Status, r.PaymentAmount, r.PaymentDate, r.PaymentMethod
+        FROM Rental r
+        JOIN Customer c ON c.CustomerID = r.CustomerID
+        JOIN Hotel h ON h.HotelID = r.HotelID
+        LEFT JOIN Employee e ON e.EmployeeID = r.EmployeeID
+    """, 'r.HotelID', 'r.CheckInDate', 'r.RentalID'),
+    'booking-archive': ("""
+        SELECT BookingID, HotelID, HotelName, RoomIdentifier, CustomerName,
+               BookingDate, CheckInDate, CheckOutDate, Status, ArchiveDate
+        FROM BookingArchive
+    """, 'HotelID', 'ArchiveDate', 'BookingID'),
+    'rental-archive': ("""
+        SELECT RentalID, HotelID, HotelName, RoomIdentifier, CustomerName, EmployeeName, BookingID,
+               CheckInDate, CheckOutDate, Status, PaymentAmount, PaymentDate, PaymentMethod, ArchiveDate
+        FROM RentalArchive
+    """, 'HotelID', 'ArchiveDate', 'RentalID'),
+}
+
+
+def export_query(kind, hotel_id=None, date_from=None, date_to=None):
+    """SQL and params for one export, filtered to a hotel and an inclusive date range (None: no filter)."""
+    query, hotel_column, date_column, id_column = EXPORTS[kind]
+    clauses, params = [], {}
+    if hotel_id is not None:
+        clauses.append(f"{hotel_column} = :hid")
+        params['hid'] = hotel_id
+    if date_from is not None:
+        clauses.append(f"{date_column} >= :date_from")
+        params['date_from'] = date_from
+    if date_to is not None:
+        clauses.append(f"{date_column} <= :date_to")
+        params['date_to'] = date_to
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return f"{query} {where} ORDER BY {date_column}, {id_column}", params
+
+
+def stream_csv(kind, **filters):
+    """
+    Yield the export as CSV text, ROWS_PER_CHUNK rows at a time, from a server-side cursor,
+    so memory stays flat however many rows match. Wrap it in stream_with_context().
+    """
+    query, params = export_query(kind, **filters)
+    result = db.session.execute(text(query), params,
+                                execution_options={"stream_results": True}).yield_per(ROWS_PER_CHUNK)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    yield buffer.getvalue()
+    for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+    db.session.commit()
+
+
+def copy_csv(kind, out, **filters):
+    """
+    Write the export as CSV to the file object `out` with COPY ... TO STDOUT, which streams
+    straight from PostgreSQL without building rows in Python. Returns the number of rows.
+    """
+    query, params = export_query(kind, **filters)
+    # COPY takes no bind parameters; the filters are ints and dates, rendered as SQL literals
+    statement = text(query).bindparams(**params).compile(dialect=db.engine.dialect,
+                                                         compile_kwargs={"literal_binds": True})
+    try:
+        with db.session.connection().connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY ({statement}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+            copied = cursor.rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return copied
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import time
+import uuid
+from functools import wraps
+from flask import current_app, flash, g, has_request_context, make_response, request, session
+from sqlalchemy import event, text
+from app import db
+
+FORM_FIELD = 'idempotency_key'
+HEADER = 'Idempotency-Key'
+
+FAILED_AFTER_COMMIT = "The request was saved but its response could not be built. Check before sending it again."
+
+
+def new_key():
+    """Fresh key for a form's hidden idempotency_key field (available in templates as idempotency_key())."""
+    return uuid.uuid4().hex
+
+
+def _request_hash():
+    fields = sorted((name, value) for name, value in request.form.items(multi=True) if name != FORM_FIELD)
+    return hashlib.sha256(json.dumps([request.path, fields]).encode()).hexdigest()
+
+
+def _claim(scope, key, request_hash):
+    """
+    Insert the placeholder row for this key; False if the key is already taken and not expired.
+    The placeholder only holds the key for IDEMPOTENCY_LEASE seconds (_store extends it to the full
+    TTL), so a request whose worker died mid-way does not block retries of that key for a day.
+    """
+    try:
+        claimed = db.session.execute(text("""
+            INSERT INTO IdempotencyKey (Scope, IdempotencyKey, RequestHash, ExpiresAt)
+            VALUES (:scope, :key, :hash, CURRENT_TIMESTAMP + make_interval(secs => :lease))
+            ON CONFLICT (Scope, IdempotencyKey) DO UPDATE
+            SET RequestHash = EXCLUDED.RequestHash, StatusCode = NULL, Location = NULL,
+                ContentType = NULL, Body = NULL, Flashes = NULL,
+                CreatedAt = CURRENT_TIMESTAMP, ExpiresAt = EXCLUDED.ExpiresAt
+            WHERE IdempotencyKey.ExpiresAt < CURRENT_TIMESTAMP
+            RETURNING 1
+        """), {
+            'scope': scope, 'key': key, 'hash': request_hash,
+            'lease': current_app.config['IDEMPOTENCY_LEASE']
+        }).scalar() is not None
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return claimed
+
+
+def _stored(scope, key):
+    row = db.session.execute(text("""
+        SELECT RequestHash, StatusCode, Location, ContentType, Body, Flashes
+        FROM IdempotencyKey
+        WHERE Scope = :scope AND IdempotencyKey = :key
+    """), {'scope': scope, 'key': key}).fetchone()
+    db.session.commit()
+    return row
+
+
+def _store(scope, key, response, flashes):
+    try:
+        db.session.execute(text("""
+            UPDATE IdempotencyKey
+            SET StatusCode = :status, Location = :location, ContentType = :content_type,
+                Body = :body, Flashes = CAST(:flashes AS JSONB),
+                ExpiresAt = CURRENT_TIMESTAMP + make_interval(secs => :ttl)
+            WHERE Scope = :scope AND IdempotencyKey = :key
+        """), {
+            'scope': scope, 'key': key, 'ttl': current_app.config['IDEMPOTENCY_KEY_TTL'],
+            'status': response.status_code,
+            'location': response.headers.get('Location'),
+            'content_type': response.content_type,
+            'body': response.get_data(),
+            'flashes': json.dumps(flashes)
+        })
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _count_commit(session):
+    if has_request_context():
+        g.idempotency_commits = g.get('idempotency_commits', 0) + 1
+
+
+def _release(scope, key):
+    # The request failed before writing anything: let a retry run it again rather than replay the failure
+    db.session.rollback()
+    db.session.execute(text("""
+        DELETE FROM IdempotencyKey WHERE Scope = :scope AND IdempotencyKey = :key
+    """), {'scope': scope, 'key': key})
+    db.session.commit()
+
+
+def _replay(row):
+    for category, message in row.flashes or []:
+        flash(message, category)
+    response = make_response(bytes(row.body or b''), row.statuscode)
+    if row.contenttype:
+        response.content_type = row.contenttype
+    if row.location:
+        response.headers['Location'] = row.location
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Run a POST at most once per idempotency key.
+
+    The key comes from the Idempotency-Key header or the idempotency_key form field, and is
+    scoped to the logged-in user and the endpoint. The first request claims the key and its
+    response (status, redirect, body and flashed messages) is stored; a retry with the same key
+    gets that response back without running the view, so no trigger fires twice. A retry that
+    arrives while the first request is still running waits for it (up to IDEMPOTENCY_WAIT
+    seconds, then 409); once the first request's IDEMPOTENCY_LEASE has run out without a stored
+    response, a retry claims the key and runs the view. A view that raises before committing
+    releases its key so the retry runs it again; one that raises after committing stores a 500
+    for the key instead. Requests without a key run as before.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER) or request.form.get(FORM_FIELD)
+        if request.method != 'POST' or not key:
+            return view(*args, **kwargs)
+        if len(key) > 100:
+            return "Idempotency key is too long.", 400
+
+        scope = f"{session.get('user_type')}:{session.get('user_id')}:{request.endpoint}"
+        request_hash = _request_hash()
+
+        if _claim(scope, key, request_hash):
+            flashes_before = len(session.get('_flashes', []))
+            commits_before = g.get('idempotency_commits', 0)
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                if g.get('idempotency_commits', 0) == commits_before:
+                    _release(scope, key)
+                else:
+                    # The view committed its write before failing (e.g. while rendering the page):
+                    # keep the key so a retry gets this error instead of writing a second time
+                    db.session.rollback()
+                    _store(scope, key, make_response(FAILED_AFTER_COMMIT, 500), [])
+                raise
+            _store(scope, key, response, session.get('_flashes', [])[flashes_before:])
+            return response
+
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT']
+        while True:
+            row = _stored(scope, key)
+            if row is None:
+                # The first request failed and released the key: this one runs instead
+                return wrapper(*args, **kwargs)
+            if row.requesthash != request_hash:
+                return "Idempotency key was already used for a different request.", 422
+            if row.statuscode is not None:
+                return _replay(row)
+            if time.monotonic() >= deadline:
+                return "A request with this idempotency key is still in progress.", 409
+            time.sleep(0.1)
+
+    return wrapper
+
+
+def sweep_expired(batch_size):
+    """Delete expired keys batch_size rows per transaction; returns how many were deleted."""
+    total = 0
+    while True:
+        try:
+            deleted = db.session.execute(text("""
+                DELETE FROM IdempotencyKey
+                WHERE (Scope, IdempotencyKey) IN (
+                    SELECT Scope, IdempotencyKey FROM IdempotencyKey
+                    WHERE ExpiresAt < CURRENT_TIMESTAMP
+                    LIMIT :batch_size
+                    FOR UPDATE SKIP LOCKED
+                )
+            """), {'batch_size': batch_size}).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def init_app(app):
+    app.jinja_env.globals['idempotency_key'] = new_key
+    # Counts commits per request, so a view that fails after committing its write keeps its key
+    if not event.contains(db.session, 'after_commit', _count_commit):
+        event.listen(db.session, 'after_commit', _count_commit)
@@ -0,0 +1,149 @@
+from sqlalchemy import text
+from app import db
+from concurrency import run_in_transaction
+
+
+def run_in_batches(statement, batch_size, **params):
+    """
+    Run a batched UPDATE/DELETE (which must LIMIT itself to :batch_size rows) until it
+    touches fewer rows than that, one transaction per batch so locks stay short.
+    Returns the number of rows touched.
+    """
+    total = 0
+    while True:
+        try:
+            touched = db.session.execute(text(statement), dict(params, batch_size=batch_size)).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        total += touched
+        if touched < batch_size:
+            return total
+
+
+def reconcile_rentals(batch_size):
+    """
+    Move rentals and their rooms to the status the calendar says they should have:
+    rentals past their check-out date become Completed (the rental trigger frees the room),
+    and rooms of rentals running today are marked Occupied. Only rows that change are written.
+    Returns (completed rentals, rooms marked Occupied).
+    """
+    # Both scans walk idx_rental_ongoing (Ongoing rentals only, by check-out date)
+    completed = run_in_batches("""
+        UPDATE Rental r
+        SET Status = 'Completed'
+        FROM (
+            SELECT RentalID FROM Rental
+            WHERE Status = 'Ongoing' AND CheckOutDate < CURRENT_DATE
+            ORDER BY CheckOutDate
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        ) batch
+        WHERE r.RentalID = batch.RentalID
+    """, batch_size)
+
+    occupied = run_in_batches("""
+        UPDATE Room rm
+        SET Status = 'Occupied'
+        FROM (
+            SELECT DISTINCT rm.HotelID, rm.RoomID
+            FROM Rental r
+            JOIN Room rm ON rm.HotelID = r.HotelID AND rm.RoomID = r.RoomID
+            -- Stay is [CheckInDate, CheckOutDate): the check-out night is free, as in RoomCalendar
+            WHERE r.Status = 'Ongoing' AND r.CheckOutDate > CURRENT_DATE AND r.CheckInDate <= CURRENT_DATE
+              AND rm.Status <> 'Occupied'
+            LIMIT :batch_size
+        ) batch
+        WHERE rm.HotelID = batch.HotelID AND rm.RoomID = batch.RoomID
+    """, batch_size)
+
+    return completed, occupied
+
+
+def _rollover_hotel(hotel_id):
+    # Same room locks as booking and rental writes, taken in key order. Taking them before the UPDATE
+    # (rather than in it) gives the UPDATE a snapshot that includes every write that held one.
+    db.session.execute(text("""
+        SELECT 1 FROM Room WHERE HotelID = :hid ORDER BY RoomID FOR NO KEY UPDATE
+    """), {'hid': hotel_id})
+    return db.session.execute(text("""
+        UPDATE Room rm
+        SET Status = target.Status
+        FROM (
+            SELECT r.HotelID, r.RoomID,
+                   CASE
+                       WHEN EXISTS (
+                           SELECT 1 FROM Rental re
+                           WHERE re.HotelID = r.HotelID AND re.RoomID = r.RoomID AND re.Status = 'Ongoing'
+                             AND re.Stay @> CURRENT_DATE
+                       ) OR EXISTS (
+                           SELECT 1 FROM Booking b
+                           WHERE b.HotelID = r.HotelID AND b.RoomID = r.RoomID AND b.Status = 'Checked-in'
+                             AND b.Stay @> CURRENT_DATE
+                       ) THEN 'Occupied'
+                       WHEN EXISTS (
+                           SELECT 1 FROM Booking b
+                           WHERE b.HotelID = r.HotelID AND b.RoomID = r.RoomID AND b.Status = 'Pending'
+                             AND b.Stay @> CURRENT_DATE
+                       ) THEN 'Booked'
+                       WHEN EXISTS (
+                           SELECT 1 FROM RoomProblems p
+                           WHERE p.HotelID = r.HotelID AND p.RoomID = r.RoomID AND p.Resolved = FALSE
+                       ) THEN 'Out-of-Order'
+                       ELSE 'Available'
+                   END AS Status
+            FROM Room r
+            WHERE r.HotelID = :hid
+        ) target
+        WHERE rm.HotelID = target.HotelID AND rm.RoomID = target.RoomID
+          AND rm.Status <> target.Status
+    """), {'hid': hotel_id}).rowcount
+
+
+def rollover_room_status():
+    """
+    Recompute every room's status for today from its rentals, bookings and unresolved problems:
+    Occupied (ongoing rental or checked-in stay), then Booked (pending stay), then Out-of-Order,
+    else Available. One transaction and one UPDATE per hotel; only rooms whose status changes are
+    written. Returns (rooms changed, hotels processed).
+    """
+    hotels = db.session.execute(text("SELECT HotelID FROM Hotel ORDER BY HotelID")).scalars().all()
+    db.session.commit()
+    changed = sum(run_in_transaction(_rollover_hotel, hotel_id) for hotel_id in hotels)
+    return changed, len(hotels)
+
+
+def purge_history(before, batch_size):
+    """
+    Delete finished history that ended before `before`, batch_size rows per transaction;
+    the statement-level archive triggers copy each batch into the archive tables.
+
+    Completed rentals go first, then cancelled or checked-in bookings that no rental still points
+    to (deleting those would rewrite the rental's BookingID, firing the rental triggers).
+    Returns (rentals purged, bookings purged).
+    """
+    rentals = run_in_batches("""
+        DELETE FROM Rental
+        WHERE RentalID IN (
+            SELECT RentalID FROM Rental
+            WHERE Status = 'Completed' AND CheckOutDate < :before
+            ORDER BY CheckOutDate
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+    """, batch_size, before=before)
+
+    bookings = run_in_batches("""
+        DELETE FROM Booking
+        WHERE BookingID IN (
+            SELECT b.BookingID FROM Booking b
+            WHERE b.Status IN ('Cancelled', 'Checked-in') AND b.CheckOutDate < :before
+              AND NOT EXISTS (SELECT 1 FROM Rental r WHERE r.BookingID = b.BookingID)
+            ORDER BY b.CheckOutDate
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+    """, batch_size, before=before)
+
+    return rentals, bookings
@@ -0,0 +1,117 @@
+import base64
+import json
+import re
+from flask import request, url_for
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+_DIRECTION = re.compile(r'\s+(ASC|DESC)\s*$', re.IGNORECASE)
+
+
+def encode_cursor(values):
+    # Values travel as strings; PostgreSQL coerces the quoted literals back to the column types
+    raw = json.dumps([None if value is None else str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        return None
+    return values
+
+
+class KeysetPager:
+    """
+    Keyset (seek) pagination over one ORDER BY expression taken from a route's sort map,
+    e.g. 'r.Price DESC', followed by unique tiebreaker columns in the same direction.
+    The sort expression must not be NULL (wrap nullable columns in COALESCE in the sort map),
+    since a NULL key never compares greater than the cursor and its rows would be skipped.
+    The query selects the key columns, filters on where_clause and orders by order_clause,
+    so the next page starts right after the last row instead of at an OFFSET.
+    """
+
+    def __init__(self, sort_clause, tiebreaker, cursor=None, per_page=None):
+        match = _DIRECTION.search(sort_clause)
+        self.descending = bool(match) and match.group(1).upper() == 'DESC'
+        key = sort_clause[:match.start()] if match else sort_clause
+        key = key.strip()
+        # Sorting by a tiebreaker column itself (e.g. by ID) needs no second copy of it
+        self.columns = [key] + [column for column in tiebreaker if column != key]
+
+        self.cursor = decode_cursor(cursor)
+        if self.cursor is not None and len(self.cursor) != len(self.columns):
+            self.cursor = None
+
+        try:
+            per_page = int(per_page) if per_page else DEFAULT_PER_PAGE
+        except (TypeError, ValueError):
+            per_page = DEFAULT_PER_PAGE
+        self.per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        self.next_cursor = None
+
+    @classmethod
+    def from_request(cls, sort_clause, tiebreaker):
+        """Pager for a listing page: the cursor and page size come from the after/per_page query args."""
+        return cls(sort_clause, tiebreaker, cursor=request.args.get('after'), per_page=request.args.get('per_page'))
+
+    @property
+    def select_clause(self):
+        return ', '.join(f"{column} AS sort_key_{i}" for i, column in enumerate(self.columns))
+
+    @property
+    def where_clause(self):
+        if not self.cursor:
+            return "TRUE"
+        operator = '<' if self.descending else '>'
+        keys = ', '.join(f":after_{i}" for i in range(len(self.columns)))
+        return f"({', '.join(self.columns)}) {operator} ({keys})"
+
+    @property
+    def order_clause(self):
+        direction = 'DESC' if self.descending else 'ASC'
+        return ', '.join(f"{column} {direction}" for column in self.columns)
+
+    @property
+    def limit_clause(self):
+        # One extra row tells us whether a next page exists
+        return f"LIMIT {self.per_page + 1}"
+
+    @property
+    def params(self):
+        return {f"after_{i}": value for i, value in enumerate(self.cursor or [])}
+
+    def rows(self, result):
+        """Yield at most per_page rows from result, recording the cursor of the next page."""
+        last = None
+        for count, row in enumerate(result):
+            if count == self.per_page:
+                keys = [last._mapping[f"sort_key_{i}"] for i in range(len(self.columns))]
+                self.next_cursor = encode_cursor(keys)
+                break
+            last = row
+            yield row
+        result.close()
+
+    @property
+    def is_first_page(self):
+        return not self.cursor
+
+    @property
+    def next_url(self):
+        args = request.args.to_dict()
+        args['after'] = self.next_cursor
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def first_url(self):
+        args = request.args.to_dict()
+        args.pop('after', None)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
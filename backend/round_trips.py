@@ -0,0 +1,30 @@
+from flask import g, has_request_context
+from sqlalchemy import event
+from app import db
+
+HEADER = 'X-DB-Round-Trips'
+
+
+def _count(*args, **kwargs):
+    if has_request_context():
+        g.db_round_trips = g.get('db_round_trips', 0) + 1
+
+
+def _add_header(response):
+    response.headers[HEADER] = str(g.get('db_round_trips', 0))
+    return response
+
+
+def init_app(app):
+    """
+    When COUNT_DB_ROUND_TRIPS is set, count the database round trips of every request
+    (BEGIN, each statement, COMMIT and ROLLBACK) and report them in an X-DB-Round-Trips
+    response header. benchmarks/round_trips.py checks the write routes against a budget.
+    """
+    if not app.config['COUNT_DB_ROUND_TRIPS']:
+        return
+    with app.app_context():
+        engine = db.engine
+    for name in ('begin', 'before_cursor_execute', 'commit', 'rollback'):
+        event.listen(engine, name, _count)
+    app.after_request(_add_header)
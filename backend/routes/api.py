@@ -0,0 +1,125 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import date
+from decimal import Decimal
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from werkzeug.exceptions import HTTPException
+from app import db
+from concurrency import RETRYABLE_SQLSTATES
+from pagination import KeysetPager
+from search import SORT_MAP, cache_key, candidate_hotels, normalize_filters, normalize_sort, parse_stay, room_search_query
+from search_cache import search_cache
+
+
+bp_api = Blueprint('api', __name__)
+
+# serialization_failure, deadlock_detected, lock_not_available, query_canceled (statement timeout),
+# too_many_connections: the request itself was fine and can be sent again
+TRANSIENT_SQLSTATES = RETRYABLE_SQLSTATES | {'55P03', '57014', '53300'}
+
+# Columns of a search row sent to partners (the sort_key_* columns stay internal)
+ROOM_FIELDS = ('hotelid', 'roomid', 'price', 'capacity', 'viewtype', 'extendable', 'status',
+               'hotelname', 'address', 'chainname', 'rating', 'num_rooms', 'amenities', 'problem_cause')
+
+
+@bp_api.before_request
+def require_api_key():
+    key = request.headers.get('X-API-Key', '')
+    if not any(hmac.compare_digest(key, valid) for valid in current_app.config['API_KEYS']):
+        return jsonify({'error': 'Invalid or missing API key'}), 401
+
+
+@bp_api.errorhandler(Exception)
+def handle_api_errors(e):
+    db.session.rollback()
+    if isinstance(e, HTTPException):
+        return jsonify({'error': e.description}), e.code
+    pgcode = getattr(getattr(e, 'orig', None), 'pgcode', None) or ''
+    # Only the partner's own request is reported back: trigger rejections (RAISE EXCEPTION) and
+    # constraint violations. Server-side faults get a generic message, never PostgreSQL's text
+    if pgcode == 'P0001' or pgcode.startswith('23'):
+        return jsonify({'error': e.orig.diag.message_primary or "The request was rejected."}), 400
+    if pgcode in TRANSIENT_SQLSTATES or getattr(e, 'connection_invalidated', False) or isinstance(e, OperationalError):
+        return jsonify({'error': "The service is temporarily unavailable. Please retry."}), 503
+    return jsonify({'error': "An unexpected error occurred."}), 500
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _ndjson(record):
+    return json.dumps(record, default=_json_default) + '\n'
+
+
+def _room_record(row):
+    mapping = row._mapping
+    return {field: mapping[field] for field in ROOM_FIELDS}
+
+
+@bp_api.route('/api/search')
+def search():
+    """
+    Same filters, sort and keyset cursor as the customer search page, streamed as NDJSON:
+    one JSON object per room, then {"next": "<cursor>"} when another page exists.
+    """
+    checkin, checkout, error = parse_stay(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    filters = normalize_filters(request.args)
+    sort_by = normalize_sort(request.args.get("sort"))
+    pager = KeysetPager(SORT_MAP[sort_by], ("rs.HotelID", "rs.RoomID"),
+                        cursor=request.args.get("after"), per_page=request.args.get("per_page"))
+
+    # Shares its entries with the HTML search page
+    key = cache_key('search', checkin, checkout, filters, sort_by, tuple(pager.cursor or ()), pager.per_page)
+
+    # The tag changes with every write the cache sees and at least once per TTL,
+    # so rows changed outside the app are not served as "not modified" forever.
+    # A TTL of 0 turns the cache off, and with it the ETag and 304 responses
+    ttl = current_app.config['SEARCH_CACHE_TTL']
+    etag = hashlib.sha1(repr((key, search_cache.generation, int(time.time() // ttl))).encode()).hexdigest() if ttl else None
+    headers = {'Cache-Control': f'private, max-age={ttl}'}
+    if etag and request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    cached = search_cache.get(key)
+    if cached is not None:
+        rooms, next_cursor = cached
+
+        def generate():
+            for row in rooms:
+                yield _ndjson(_room_record(row))
+            if next_cursor:
+                yield _ndjson({'next': next_cursor})
+    else:
+        generation = search_cache.generation
+        hotels = candidate_hotels(filters)
+
+        query, params = room_search_query(filters, pager, checkin, checkout)
+        results = db.session.execute(text(query), params, execution_options={"stream_results": True})
+
+        def generate():
+            page = []
+            for row in pager.rows(results):
+                page.append(row)
+                yield _ndjson(_room_record(row))
+            search_cache.put(key, (page, pager.next_cursor), hotels=hotels, generation=generation)
+            if pager.next_cursor:
+                yield _ndjson({'next': pager.next_cursor})
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
+    if etag:
+        response.set_etag(etag)
+    return response
@@ -12,7 +12,7 @@ def home():
 @bp_auth.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
-        full_name_input = request.form['full_name'].strip().lower()
+        full_name_input = request.form['full_name'].strip()
         user_type = request.form['user_type']
         selected_position = request.form.get('position')
         password = request.form.get('password', '').strip()
@@ -30,7 +30,8 @@ def login():
             if password != 'customer':
                 return render_template('login.html', error="Incorrect password for customer.")
 
-            query = text("SELECT CustomerID, FullName FROM Customer WHERE CustomerID = :id AND LOWER(FullName) = :name")
+            # The primary key finds the row; the name is compared case-insensitively by PostgreSQL on both sides
+            query = text("SELECT CustomerID, FullName FROM Customer WHERE CustomerID = :id AND LOWER(FullName) = LOWER(:name)")
             result = db.session.execute(query, {'id': user_id, 'name': full_name_input}).fetchone()
 
             if not result:
@@ -57,7 +58,7 @@ def login():
             query = text("""
                 SELECT EmployeeID, Position, HotelID, FullName
                 FROM Employee
-                WHERE EmployeeID = :id AND LOWER(FullName) = :name
+                WHERE EmployeeID = :id AND LOWER(FullName) = LOWER(:name)
             """)
             result = db.session.execute(query, {'id': user_id, 'name': full_name_input}).fetchone()
 
@@ -95,18 +96,12 @@ def register():
         if not full_name or not address or not id_type or not id_number:
             return render_template('register.html', error="Please fill in all fields.")
 
-        existing = db.session.execute(text("""
-            SELECT 1 FROM Customer WHERE LOWER(FullName) = :name AND IDNumber = :idnum
-        """), {'name': full_name.lower(), 'idnum': id_number}).fetchone()
-
-        if existing:
-            return render_template('register.html', error="An account with that name and ID already exists.")
-
         try:
-            
-            result = db.session.execute(text("""
+            # IDNumber is unique: a duplicate registration inserts nothing instead of running a lookup first
+            new_customer_id = db.session.execute(text("""
                 INSERT INTO Customer (FullName, Address, IDType, IDNumber, RegistrationDate)
                 VALUES (:name, :address, :idtype, :idnum, :regdate)
+                ON CONFLICT (IDNumber) DO NOTHING
                 RETURNING CustomerID
             """), {
                 'name': full_name,
@@ -114,17 +109,18 @@ def register():
                 'idtype': id_type,
                 'idnum': id_number,
                 'regdate': registration_date
-            })
-
-            new_customer_id = result.fetchone()[0]
+            }).scalar()
             db.session.commit()
 
-            return render_template('register_success.html', customer_id=new_customer_id, full_name=full_name)
-
         except Exception:
             db.session.rollback()
             raise
 
+        if new_customer_id is None:
+            return render_template('register.html', error="An account with that ID number already exists.")
+
+        return render_template('register_success.html', customer_id=new_customer_id, full_name=full_name)
+
     return render_template('register.html')
 
 
@@ -1,7 +1,15 @@
-from flask import Blueprint, flash, render_template, request, redirect, url_for, session
+from flask import Blueprint, flash, jsonify, render_template, request, redirect, url_for, session, stream_template
 from sqlalchemy import text
-from datetime import date, datetime
+import calendar
+from datetime import date, datetime, timedelta
 from app import db
+from concurrency import run_in_transaction
+from idempotency import idempotent
+from pagination import KeysetPager
+from search import (AVAILABILITY_CLAUSE, BOOKABLE_CLAUSE, FACETS, FLEX_MAX_DAYS, FLEX_MAX_NIGHTS, PRICE_BUCKET,
+                    SORT_MAP, availability_clause, cache_key, candidate_hotels, filter_clauses, normalize_filters,
+                    normalize_sort, parse_stay, room_search_query)
+from search_cache import search_cache
 
 
 bp_customer = Blueprint('customer', __name__)
@@ -11,118 +19,235 @@ def search_rooms():
     if 'user_type' not in session or session['user_type'] != 'customer':
         return redirect(url_for('auth.login'))
 
-    checkin = request.args.get("checkin")
-    checkout = request.args.get("checkout")
-    sort_by = request.args.get("sort")
-
-    if not checkin or not checkout:
+    if not request.args.get("checkin") or not request.args.get("checkout"):
         return render_template("customer/search.html", rooms=[], checkin=None, checkout=None)
 
-    try:
-        checkin = datetime.strptime(checkin, "%Y-%m-%d").date()
-        checkout = datetime.strptime(checkout, "%Y-%m-%d").date()
-        if checkin >= checkout:
-            return render_template("customer/search.html", rooms=[], checkin=checkin, checkout=checkout, error="Check-out must be after check-in")
-    except Exception:
-        return render_template("customer/search.html", rooms=[], checkin=None, checkout=None, error="Invalid dates")
-
-    filters = ["r.Status = 'Available'"]
-    params = {"checkin": checkin, "checkout": checkout}
-
-    if request.args.get("capacity"):
-        filters.append("r.Capacity = :capacity")
-        params["capacity"] = request.args["capacity"]
-
-    if request.args.get("area"):
-        filters.append("h.Address ILIKE :area")
-        params["area"] = f"%{request.args['area']}%"
-
-    if request.args.get("chain"):
-        filters.append("hc.ChainName ILIKE :chain")
-        params["chain"] = f"%{request.args['chain']}%"
-
-    if request.args.get("category"):
-        filters.append("h.Category = :category")
-        params["category"] = request.args["category"]
-
-    if request.args.get("price"):
-        filters.append("r.Price <= :price")
-        params["price"] = request.args["price"]
-
-    if request.args.get("minrooms"):
-        filters.append("h.Num_Rooms >= :minrooms")
-        params["minrooms"] = request.args["minrooms"]
-
-    if request.args.get("minhotelrooms"):
-        filters.append("h.Num_Rooms >= :minhotelrooms")
-        params["minhotelrooms"] = request.args["minhotelrooms"]
-
-    if request.args.get("viewtype"):
-        filters.append("r.ViewType = :viewtype")
-        params["viewtype"] = request.args["viewtype"]
-
-    
-    order_clause = "r.Price"
-    if sort_by == "price_desc":
-        order_clause = "r.Price DESC"
-    elif sort_by == "rating":
-        order_clause = "h.Rating DESC"
-    elif sort_by == "rating_asc":
-        order_clause = "h.Rating ASC"
-    elif sort_by == "category":
-        order_clause = "h.Category"
-    elif sort_by == "capacity":
-        order_clause = "CASE r.Capacity WHEN 'suite' THEN 5 WHEN 'family' THEN 4 WHEN 'triple' THEN 3 WHEN 'double' THEN 2 WHEN 'single' THEN 1 ELSE 6 END DESC"
-    elif sort_by == "capacity_asc":
-        order_clause = "CASE r.Capacity WHEN 'single' THEN 1 WHEN 'double' THEN 2 WHEN 'triple' THEN 3 WHEN 'family' THEN 4 WHEN 'suite' THEN 5 ELSE 6 END ASC"
-    elif sort_by == "amenities":
-        order_clause = """(
-            SELECT COUNT(*) FROM RoomAmenities ra
-            WHERE ra.HotelID = r.HotelID AND ra.RoomID = r.RoomID
-        ) DESC"""
-    elif sort_by == "amenities_least":
-        order_clause = """(
-            SELECT COUNT(*) FROM RoomAmenities ra
-            WHERE ra.HotelID = r.HotelID AND ra.RoomID = r.RoomID
-        ) ASC"""
-
-    query = f"""
-        SELECT r.*, h.HotelName, h.Address, hc.ChainName, h.Rating, h.Num_Rooms,
-            (
-                SELECT string_agg(ra.Amenity, ', ')
-                FROM RoomAmenities ra
-                WHERE ra.HotelID = r.HotelID AND ra.RoomID = r.RoomID
-            ) AS amenities,
-            (
-                SELECT p.Problem
-                FROM RoomProblems p
-                WHERE p.HotelID = r.HotelID AND p.RoomID = r.RoomID AND p.Resolved = FALSE
-                ORDER BY p.ReportDate DESC
-                LIMIT 1
-            ) AS problem_cause
-        FROM Room r
-        JOIN Hotel h ON r.HotelID = h.HotelID
-        JOIN HotelChain hc ON h.HotelChainID = hc.HotelChainID
-        WHERE
-            {' AND '.join(filters)} AND
-            NOT EXISTS (
-                SELECT 1 FROM Booking b
-                WHERE b.RoomID = r.RoomID AND b.HotelID = r.HotelID
-                AND (b.CheckInDate, b.CheckOutDate) OVERLAPS (:checkin, :checkout)
-            ) AND
-            NOT EXISTS (
-                SELECT 1 FROM Rental rt
-                WHERE rt.RoomID = r.RoomID AND rt.HotelID = r.HotelID
-                AND (rt.CheckInDate, rt.CheckOutDate) OVERLAPS (:checkin, :checkout)
-            )
-        ORDER BY {order_clause}
-    """
-    results = db.session.execute(text(query), params).fetchall()
-    return render_template("customer/search.html", rooms=results, checkin=checkin, checkout=checkout)
+    checkin, checkout, error = parse_stay(request.args)
+    if error:
+        return render_template("customer/search.html", rooms=[], checkin=checkin, checkout=checkout, error=error)
+
+    filters = normalize_filters(request.args)
+    sort_by = normalize_sort(request.args.get("sort"))
+
+    pager = KeysetPager(SORT_MAP[sort_by], ("rs.HotelID", "rs.RoomID"),
+                        cursor=request.args.get("after"), per_page=request.args.get("per_page"))
+
+    key = cache_key('search', checkin, checkout, filters, sort_by, tuple(pager.cursor or ()), pager.per_page)
+    cached = search_cache.get(key)
+    if cached is not None:
+        rooms, pager.next_cursor = cached
+        return render_template("customer/search.html", rooms=rooms, pager=pager,
+                               checkin=checkin, checkout=checkout)
+
+    # Taken before reading so that a page read across a write is never cached
+    generation = search_cache.generation
+    hotels = candidate_hotels(filters)
+
+    query, params = room_search_query(filters, pager, checkin, checkout)
+    # Server-side cursor + streamed template: rows are rendered as they arrive from PostgreSQL
+    results = db.session.execute(text(query), params, execution_options={"stream_results": True})
+
+    def rows():
+        page = []
+        for row in pager.rows(results):
+            page.append(row)
+            yield row
+        search_cache.put(key, (page, pager.next_cursor), hotels=hotels, generation=generation)
+
+    return stream_template("customer/search.html", rooms=rows(), pager=pager,
+                           checkin=checkin, checkout=checkout)
+
 
+@bp_customer.route('/customer/search/facets')
+def search_facets():
+    if 'user_type' not in session or session['user_type'] != 'customer':
+        return redirect(url_for('auth.login'))
+
+    checkin, checkout, error = parse_stay(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    filters = normalize_filters(request.args)
+    key = cache_key('facets', checkin, checkout, filters)
+    facets = search_cache.get(key)
+    if facets is not None:
+        return jsonify(facets)
+
+    generation = search_cache.generation
+    hotels = candidate_hotels(filters)
+
+    clauses, params = filter_clauses(filters)
+    params.update(checkin=checkin, checkout=checkout)
+
+    # One pass over the available rooms: one grouping set per facet plus the grand total.
+    # GROUPING() has a bit set for every column not grouped by, so each facet has one bit clear.
+    rows = db.session.execute(text(f"""
+        SELECT Capacity, ViewType, Category, ChainName, PriceFrom,
+               GROUPING(Capacity, ViewType, Category, ChainName, PriceFrom) AS grouping_id,
+               COUNT(*) AS rooms
+        FROM (
+            SELECT rs.Capacity, rs.ViewType, rs.Category, rs.ChainName,
+                   FLOOR(rs.Price / {PRICE_BUCKET}) * {PRICE_BUCKET} AS PriceFrom
+            FROM RoomSearch rs
+            WHERE
+                {' AND '.join(clauses)} AND
+                {AVAILABILITY_CLAUSE}
+        ) available
+        GROUP BY GROUPING SETS ((Capacity), (ViewType), (Category), (ChainName), (PriceFrom), ())
+    """), params).fetchall()
+
+    facets = {'total': 0, **{name: {} for name in FACETS}}
+    for row in rows:
+        grouped = [i for i in range(len(FACETS)) if not row.grouping_id & (1 << (len(FACETS) - 1 - i))]
+        if not grouped:
+            facets['total'] = row.rooms
+            continue
+        index = grouped[0]
+        value = row[index]
+        if FACETS[index] == 'price':
+            value = f"{int(value)}-{int(value) + PRICE_BUCKET}"
+        facets[FACETS[index]][value] = row.rooms
+
+    search_cache.put(key, facets, hotels=hotels, generation=generation)
+    return jsonify(facets)
+
+
+@bp_customer.route('/customer/search/flexible')
+def flexible_search():
+    if 'user_type' not in session or session['user_type'] != 'customer':
+        return redirect(url_for('auth.login'))
+
+    capacities = ['single', 'double', 'triple', 'family', 'suite']
+    try:
+        flex = min(max(int(request.args.get('flex', 3)), 0), FLEX_MAX_DAYS)
+    except ValueError:
+        flex = 3
+
+    if not request.args.get("checkin") or not request.args.get("checkout"):
+        return render_template("customer/flexible_search.html", matrix=None, flex=flex, capacities=capacities)
+
+    checkin, checkout, error = parse_stay(request.args)
+    nights = (checkout - checkin).days if not error else None
+    if not error and nights > FLEX_MAX_NIGHTS:
+        error = f"Flexible search covers stays of up to {FLEX_MAX_NIGHTS} nights"
+    if error:
+        return render_template("customer/flexible_search.html", matrix=None, flex=flex, capacities=capacities,
+                               checkin=checkin, checkout=checkout, error=error)
+
+    filters = normalize_filters(request.args)
+    key = cache_key('flexible', checkin, checkout, filters, flex)
+    matrix = search_cache.get(key)
+
+    if matrix is None:
+        generation = search_cache.generation
+        hotels = candidate_hotels(filters)
+
+        clauses, params = filter_clauses(filters)
+        params.update(
+            first=max(checkin - timedelta(days=flex), date.today()),
+            last=checkin + timedelta(days=flex),
+            nights=nights
+        )
 
+        # Every shifted stay of the same length in one pass: the window of check-in dates is joined
+        # against the rooms, each pair is probed in the calendar, and the grouping sets give the
+        # cheapest price per (check-in, capacity) and per check-in across all capacities
+        rows = db.session.execute(text(f"""
+            SELECT s.CheckIn, s.CheckOut, rs.Capacity, GROUPING(rs.Capacity) AS all_capacities,
+                   MIN(rs.Price) AS min_price, COUNT(*) AS rooms
+            FROM (
+                SELECT d::DATE AS CheckIn, d::DATE + :nights AS CheckOut
+                FROM generate_series(CAST(:first AS TIMESTAMP), CAST(:last AS TIMESTAMP), INTERVAL '1 day') AS d
+            ) s
+            JOIN RoomSearch rs ON {' AND '.join(clauses)}
+            WHERE {availability_clause('s.CheckIn', 's.CheckOut')}
+            GROUP BY GROUPING SETS ((s.CheckIn, s.CheckOut, rs.Capacity), (s.CheckIn, s.CheckOut))
+            ORDER BY s.CheckIn
+        """), params).fetchall()
+
+        matrix = []
+        day = params['first']
+        by_day = {}
+        while day <= params['last']:
+            by_day[day] = {'checkin': day, 'checkout': day + timedelta(days=nights), 'any': None, 'by_capacity': {}}
+            matrix.append(by_day[day])
+            day += timedelta(days=1)
+        for row in rows:
+            cell = (row.min_price, row.rooms)
+            if row.all_capacities:
+                by_day[row.checkin]['any'] = cell
+            else:
+                by_day[row.checkin]['by_capacity'][row.capacity] = cell
+
+        search_cache.put(key, matrix, hotels=hotels, generation=generation)
+
+    prices = [day['any'][0] for day in matrix if day['any']]
+    return render_template("customer/flexible_search.html", matrix=matrix, flex=flex, capacities=capacities,
+                           checkin=checkin, checkout=checkout, filters=filters,
+                           best_price=min(prices) if prices else None)
+
+
+@bp_customer.route('/customer/hotels/<int:hotel_id>/calendar')
+def hotel_calendar(hotel_id):
+    if 'user_type' not in session or session['user_type'] != 'customer':
+        return redirect(url_for('auth.login'))
 
+    hotel = db.session.execute(text("""
+        SELECT h.HotelID, h.HotelName, h.Address, hc.ChainName
+        FROM Hotel h
+        JOIN HotelChain hc ON h.HotelChainID = hc.HotelChainID
+        WHERE h.HotelID = :hid
+    """), {'hid': hotel_id}).fetchone()
+    if not hotel:
+        flash("❌ Hotel not found.")
+        return redirect(url_for('customer.view_all_hotels'))
 
+    try:
+        first = datetime.strptime(request.args.get('month', ''), "%Y-%m").date()
+    except ValueError:
+        first = date.today().replace(day=1)
+    last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+    key = ('calendar', hotel_id, first.isoformat())
+    nights = search_cache.get(key)
+
+    if nights is None:
+        generation = search_cache.generation
+
+        # Every night of the month against every room of the hotel in one pass; a room is free on a
+        # night without a calendar row, and only rooms the search pages offer are counted
+        rows = db.session.execute(text(f"""
+            SELECT n::DATE AS Night, rs.Capacity, GROUPING(rs.Capacity) AS all_capacities,
+                   COUNT(*) AS free_rooms, MIN(rs.Price) AS min_price
+            FROM generate_series(CAST(:first AS TIMESTAMP), CAST(:last AS TIMESTAMP), INTERVAL '1 day') AS n
+            JOIN RoomSearch rs ON rs.HotelID = :hid AND {BOOKABLE_CLAUSE}
+            WHERE {availability_clause('n::DATE', 'n::DATE + 1')}
+            GROUP BY GROUPING SETS ((n::DATE, rs.Capacity), (n::DATE))
+        """), {'hid': hotel_id, 'first': first, 'last': last}).fetchall()
+
+        nights = {}
+        for row in rows:
+            night = nights.setdefault(row.night, {'any': None, 'by_capacity': {}})
+            cell = (row.min_price, row.free_rooms)
+            if row.all_capacities:
+                night['any'] = cell
+            else:
+                night['by_capacity'][row.capacity] = cell
+
+        search_cache.put(key, nights, hotels=frozenset([hotel_id]), generation=generation)
+
+    return render_template(
+        "customer/hotel_calendar.html",
+        hotel=hotel,
+        month=first,
+        weeks=calendar.Calendar().monthdatescalendar(first.year, first.month),
+        nights=nights,
+        prev_month=(first - timedelta(days=1)).strftime("%Y-%m"),
+        next_month=(last + timedelta(days=1)).strftime("%Y-%m"),
+        capacities=['single', 'double', 'triple', 'family', 'suite'],
+        today=date.today(),
+        one_day=timedelta(days=1)
+    )
 
 
 @bp_customer.route('/customer/bookings')
@@ -146,6 +271,7 @@ def my_bookings():
 
 
 @bp_customer.route('/customer/book', methods=['POST'])
+@idempotent
 def book_room():
     if 'user_type' not in session or session['user_type'] != 'customer':
         flash("You must be logged in to book a room.")
@@ -158,11 +284,23 @@ def book_room():
     customer_id = session['user_id']
     today = date.today()
 
-    try:
-        
-        db.session.execute(text("""
-            INSERT INTO Booking (CustomerID, HotelID, RoomID, BookingDate, CheckInDate, CheckOutDate, Status)
-            VALUES (:cid, :hid, :rid, :bdate, :checkin, :checkout, 'Pending')
+    def insert_booking():
+        # Locks the room, books it and fetches the hotel name for the confirmation in one statement
+        return db.session.execute(text("""
+            WITH room AS (
+                SELECT r.HotelID, r.RoomID, h.HotelName
+                FROM Room r
+                JOIN Hotel h ON h.HotelID = r.HotelID
+                WHERE r.HotelID = :hid AND r.RoomID = :rid
+                FOR NO KEY UPDATE OF r
+            ), booking AS (
+                INSERT INTO Booking (CustomerID, HotelID, RoomID, BookingDate, CheckInDate, CheckOutDate, Status)
+                SELECT :cid, HotelID, RoomID, :bdate, :checkin, :checkout, 'Pending'
+                FROM room
+                RETURNING BookingID
+            )
+            SELECT booking.BookingID, room.HotelName
+            FROM booking CROSS JOIN room
         """), {
             'cid': customer_id,
             'hid': hotel_id,
@@ -170,28 +308,138 @@ def book_room():
             'bdate': today,
             'checkin': checkin,
             'checkout': checkout
-        })
-        db.session.commit()
+        }).fetchone()
+
+    try:
+        booking = run_in_transaction(insert_booking)
+    except Exception:
+        db.session.rollback()
+        raise
 
-        hotel = db.session.execute(
-            text("SELECT HotelName FROM Hotel WHERE HotelID = :hid"),
-            {'hid': hotel_id}
-        ).fetchone()
-        hotel_name = hotel[0] if hotel else "Unknown Hotel"
+    if not booking:
+        flash("❌ Room not found.")
+        return redirect(request.referrer or url_for('customer.search_rooms'))
 
+    search_cache.invalidate_hotels(hotel_id)
+    return render_template(
+        "customer/book_success.html",
+        room_id=room_id,
+        hotel_name=booking.hotelname,
+        checkin=checkin,
+        checkout=checkout
+    )
 
-        return render_template(
-            "customer/book_success.html",
-            room_id=room_id,
-            hotel_name=hotel_name,
-            checkin=checkin,
-            checkout=checkout
-        )
 
+@bp_customer.route('/customer/book-group', methods=['POST'])
+def book_group():
+    if 'user_type' not in session or session['user_type'] != 'customer':
+        flash("You must be logged in to book a room.")
+        return redirect(url_for('auth.login'))
+
+    checkin, checkout, error = parse_stay(request.form)
+    if error:
+        flash(f"❌ {error}.")
+        return redirect(request.referrer or url_for('customer.search_rooms'))
+
+    try:
+        rooms = sorted({tuple(int(part) for part in value.split(':')) for value in request.form.getlist('room')})
+    except ValueError:
+        rooms = None
+    if not rooms or any(len(room) != 2 for room in rooms):
+        flash("❌ Select at least one room to book.")
+        return redirect(request.referrer or url_for('customer.search_rooms'))
+
+    customer_id = session['user_id']
+    params = {
+        'cid': customer_id,
+        'hids': [hotel_id for hotel_id, _ in rooms],
+        'rids': [room_id for _, room_id in rooms],
+        'bdate': date.today(),
+        'checkin': checkin,
+        'checkout': checkout
+    }
+
+    def book_rooms():
+        # Lock the rooms in key order (the same locks a single booking takes) so that two overlapping
+        # groups cannot deadlock, and so that no other booking of these rooms commits between the
+        # check and the insert
+        db.session.execute(text("""
+            SELECT 1 FROM Room
+            WHERE (HotelID, RoomID) IN (
+                SELECT * FROM unnest(CAST(:hids AS INTEGER[]), CAST(:rids AS INTEGER[]))
+            )
+            ORDER BY HotelID, RoomID
+            FOR NO KEY UPDATE
+        """), params)
+
+        # The booking triggers stop at the first failing row, so check every room up front
+        # with the same rules to report all conflicts at once
+        checked = db.session.execute(text("""
+            SELECT t.HotelID, t.RoomID, h.HotelName,
+                   r.RoomID IS NULL AS missing,
+                   EXISTS (
+                       SELECT 1 FROM RoomProblems p
+                       WHERE p.HotelID = t.HotelID AND p.RoomID = t.RoomID AND p.Resolved = FALSE
+                   ) AS has_problems,
+                   EXISTS (
+                       SELECT 1 FROM Booking b
+                       WHERE b.HotelID = t.HotelID AND b.RoomID = t.RoomID
+                         AND b.Status IN ('Pending', 'Checked-in')
+                         AND b.Stay && daterange(:checkin, :checkout, '[)')
+                   ) OR EXISTS (
+                       SELECT 1 FROM Rental rt
+                       WHERE rt.HotelID = t.HotelID AND rt.RoomID = t.RoomID
+                         AND rt.Stay && daterange(:checkin, :checkout, '[)')
+                   ) AS overlaps
+            FROM unnest(CAST(:hids AS INTEGER[]), CAST(:rids AS INTEGER[])) AS t(HotelID, RoomID)
+            LEFT JOIN Room r ON r.HotelID = t.HotelID AND r.RoomID = t.RoomID
+            LEFT JOIN Hotel h ON h.HotelID = t.HotelID
+            ORDER BY t.HotelID, t.RoomID
+        """), params).fetchall()
+
+        results = []
+        for room in checked:
+            reason = None
+            if room.missing:
+                reason = "❌ Room not found."
+            elif room.has_problems:
+                reason = "⛔ Cannot book room with unresolved problems."
+            elif room.overlaps:
+                reason = "⛔ Cannot book: Room already booked or rented for selected dates."
+            results.append({'hotel_id': room.hotelid, 'room_id': room.roomid,
+                            'hotel_name': room.hotelname or f"Hotel #{room.hotelid}", 'reason': reason})
+
+        active = db.session.execute(text("""
+            SELECT COALESCE(MAX(ActiveBookings), 0) FROM CustomerActiveBookings WHERE CustomerID = :cid
+        """), params).scalar()
+        limit_error = None
+        if active + len(rooms) > 5:
+            limit_error = f"❌ You have {active} active bookings; booking {len(rooms)} more would exceed the limit of 5."
+
+        if limit_error or any(result['reason'] for result in results):
+            return results, limit_error, False
+
+        # All-or-nothing: one statement for the whole group, the booking triggers still run per row
+        db.session.execute(text("""
+            INSERT INTO Booking (CustomerID, HotelID, RoomID, BookingDate, CheckInDate, CheckOutDate, Status)
+            SELECT :cid, t.HotelID, t.RoomID, :bdate, :checkin, :checkout, 'Pending'
+            FROM unnest(CAST(:hids AS INTEGER[]), CAST(:rids AS INTEGER[])) AS t(HotelID, RoomID)
+        """), params)
+        return results, None, True
+
+    # Retried as a whole on a deadlock, e.g. against a cancellation that takes the customer's
+    # booking counter lock before the room lock
+    try:
+        results, limit_error, booked = run_in_transaction(book_rooms)
     except Exception:
         db.session.rollback()
         raise
 
+    if booked:
+        search_cache.invalidate_hotels(*params['hids'])
+    return render_template("customer/group_booking.html", rooms=results, booked=booked,
+                           error=limit_error, checkin=checkin, checkout=checkout)
+
 
 @bp_customer.route('/customer/cancel-booking', methods=['POST'])
 def cancel_booking():
@@ -202,12 +450,15 @@ def cancel_booking():
     booking_id = request.form.get('booking_id')
 
     try:
-        db.session.execute(text("""
+        cancelled = db.session.execute(text("""
             UPDATE Booking
             SET Status = 'Cancelled'
             WHERE BookingID = :bid
-        """), {'bid': booking_id})
+            RETURNING HotelID
+        """), {'bid': booking_id}).fetchone()
         db.session.commit()
+        if cancelled:
+            search_cache.invalidate_hotels(cancelled.hotelid)
         flash("✅ Booking successfully cancelled.")
     except Exception:
         db.session.rollback()
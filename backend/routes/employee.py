@@ -1,7 +1,12 @@
-from flask import Blueprint, flash, render_template, request, redirect, url_for, session
+from flask import Blueprint, Response, flash, jsonify, render_template, request, redirect, url_for, session, stream_with_context
 from sqlalchemy import text
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from app import db
+from concurrency import run_in_transaction
+from exports import EXPORTS, stream_csv
+from idempotency import idempotent
+from pagination import KeysetPager
+from search_cache import search_cache
 
 bp_employee = Blueprint('employee', __name__)
 
@@ -52,53 +57,185 @@ def convert_booking():
         flash("❌ Access denied.")
         return redirect(url_for('employee.employee_dashboard'))
 
+    if position != 'Admin' and hotel_id is None:
+        flash("⚠️ Hotel information missing for your account.")
+        return redirect(url_for('employee.employee_dashboard'))
+
+    def convert():
+        # Checks the booking's hotel, locks its room, checks it in and opens the rental in one statement.
+        # The writes only run when the employee may convert it; the outer SELECT reports which case applied.
+        return db.session.execute(text("""
+            WITH target AS (
+                SELECT BookingID, CustomerID, HotelID, RoomID, CheckInDate, CheckOutDate,
+                       (CAST(:is_admin AS BOOLEAN) OR HotelID = CAST(:hotel_id AS INTEGER)) AS allowed
+                FROM Booking
+                WHERE BookingID = :bid
+            ), room AS (
+                SELECT r.HotelID, r.RoomID
+                FROM Room r
+                JOIN target t ON t.HotelID = r.HotelID AND t.RoomID = r.RoomID
+                WHERE t.allowed
+                FOR NO KEY UPDATE OF r
+            ), checked_in AS (
+                UPDATE Booking b SET Status = 'Checked-in'
+                FROM room
+                WHERE b.BookingID = :bid AND b.HotelID = room.HotelID AND b.RoomID = room.RoomID
+                RETURNING b.BookingID, b.CustomerID, b.HotelID, b.RoomID, b.CheckInDate, b.CheckOutDate
+            ), rental AS (
+                INSERT INTO Rental (
+                    CustomerID, HotelID, RoomID, EmployeeID, BookingID,
+                    CheckInDate, CheckOutDate, Status, PaymentAmount,
+                    PaymentDate, PaymentMethod
+                )
+                SELECT CustomerID, HotelID, RoomID, :eid, BookingID,
+                       CheckInDate, CheckOutDate, 'Ongoing', 0, CURRENT_DATE, 'Pending'
+                FROM checked_in
+                RETURNING RentalID
+            )
+            SELECT t.HotelID, t.allowed, (SELECT RentalID FROM rental) AS rental_id
+            FROM target t
+        """), {
+            'bid': booking_id,
+            'is_admin': position == 'Admin',
+            'hotel_id': hotel_id,
+            'eid': employee_id
+        }).fetchone()
+
     try:
-        booking = db.session.execute(text("""
-            SELECT * FROM Booking WHERE BookingID = :bid
-        """), {'bid': booking_id}).fetchone()
+        booking = run_in_transaction(convert)
+    except Exception:
+        db.session.rollback()
+        raise
 
-        if not booking:
-            flash("❌ Booking not found.")
-            return redirect(url_for('employee.employee_dashboard'))
+    if not booking:
+        flash("❌ Booking not found.")
+    elif not booking.allowed:
+        flash("❌ You are not authorized to convert bookings from other hotels.")
+    else:
+        search_cache.invalidate_hotels(booking.hotelid)
+        flash("✅ Booking converted to rental.")
 
-        
-        if position != 'Admin' and booking.hotelid != hotel_id:
-            flash("❌ You are not authorized to convert bookings from other hotels.")
-            return redirect(url_for('employee.employee_dashboard'))
+    return redirect(url_for('employee.employee_dashboard'))
 
-        db.session.execute(text("""
-            UPDATE Booking SET Status = 'Checked-in' WHERE BookingID = :bid
-        """), {'bid': booking_id})
+@bp_employee.route('/employee/bulk-checkin', methods=['POST'])
+@idempotent
+def bulk_checkin():
+    if 'user_type' not in session or session['user_type'] != 'employee':
+        flash("You must be logged in as an employee.")
+        return redirect(url_for('auth.login'))
+
+    position = session.get('position')
+    employee_id = session.get('user_id')
 
+    if position not in ['Admin', 'Manager', 'Receptionist']:
+        flash("❌ Access denied.")
+        return redirect(url_for('employee.employee_dashboard'))
+
+    try:
+        booking_ids = sorted({int(value) for value in request.form.getlist('booking_id')})
+    except ValueError:
+        booking_ids = []
+    if not booking_ids:
+        flash("❌ Select at least one booking to check in.")
+        return redirect(url_for('employee.employee_dashboard'))
+
+    hotel_id = session.get('hotel_id')
+    if position != 'Admin' and hotel_id is None:
+        flash("⚠️ Hotel information missing for your account.")
+        return redirect(url_for('employee.employee_dashboard'))
+
+    # Admins may check in bookings of any hotel, everyone else only their own hotel's
+    params = {
+        'bids': booking_ids,
+        'is_admin': position == 'Admin',
+        'hotel_id': hotel_id,
+        'eid': employee_id
+    }
+
+    def check_in():
+        # Lock the rooms of the allowed bookings in key order (the same locks a single conversion takes)
         db.session.execute(text("""
+            SELECT 1 FROM Room
+            WHERE (HotelID, RoomID) IN (
+                SELECT HotelID, RoomID FROM Booking
+                WHERE BookingID = ANY(CAST(:bids AS INTEGER[]))
+                  AND (CAST(:is_admin AS BOOLEAN) OR HotelID = CAST(:hotel_id AS INTEGER))
+            )
+            ORDER BY HotelID, RoomID
+            FOR NO KEY UPDATE
+        """), params)
+
+        # Same rules as convert_booking and prevent_overlapping_rental, for every booking at once,
+        # so one bad booking is reported instead of aborting the whole batch
+        checked = db.session.execute(text("""
+            SELECT t.BookingID, b.BookingID IS NULL AS missing,
+                   (CAST(:is_admin AS BOOLEAN) OR b.HotelID = CAST(:hotel_id AS INTEGER)) AS allowed,
+                   b.Status, b.RoomID, h.HotelName, c.FullName AS CustomerName,
+                   EXISTS (SELECT 1 FROM Rental r WHERE r.BookingID = b.BookingID) AS converted,
+                   EXISTS (
+                       SELECT 1 FROM Booking o
+                       WHERE o.HotelID = b.HotelID AND o.RoomID = b.RoomID AND o.BookingID <> b.BookingID
+                         AND o.Status IN ('Pending', 'Checked-in') AND o.Stay && b.Stay
+                   ) OR EXISTS (
+                       SELECT 1 FROM Rental r
+                       WHERE r.HotelID = b.HotelID AND r.RoomID = b.RoomID
+                         AND r.Status = 'Ongoing' AND r.Stay && b.Stay
+                   ) AS overlaps
+            FROM unnest(CAST(:bids AS INTEGER[])) AS t(BookingID)
+            LEFT JOIN Booking b ON b.BookingID = t.BookingID
+            LEFT JOIN Hotel h ON h.HotelID = b.HotelID
+            LEFT JOIN Customer c ON c.CustomerID = b.CustomerID
+            ORDER BY t.BookingID
+        """), params).fetchall()
+
+        results = []
+        for booking in checked:
+            reason = None
+            if booking.missing:
+                reason = "❌ Booking not found."
+            elif not booking.allowed:
+                reason = "❌ You are not authorized to convert bookings from other hotels."
+            elif booking.converted:
+                reason = "❌ Booking was already converted to a rental."
+            elif booking.status not in ('Pending', 'Checked-in'):
+                reason = f"❌ Booking is {booking.status.lower()}."
+            elif booking.overlaps:
+                reason = "⛔ Cannot rent: Room already booked or rented for selected dates."
+            results.append({'booking_id': booking.bookingid, 'customer_name': booking.customername,
+                            'hotel_name': booking.hotelname, 'room_id': booking.roomid, 'reason': reason})
+
+        # One insert for every booking that passed; the rental triggers mark each booking Checked-in
+        ready = [result['booking_id'] for result in results if not result['reason']]
+        converted = db.session.execute(text("""
             INSERT INTO Rental (
                 CustomerID, HotelID, RoomID, EmployeeID, BookingID,
                 CheckInDate, CheckOutDate, Status, PaymentAmount,
                 PaymentDate, PaymentMethod
-            ) VALUES (
-                :cid, :hid, :rid, :eid, :bid,
-                :checkin, :checkout, 'Ongoing', 0, CURRENT_DATE, 'Pending'
             )
-        """), {
-            'cid': booking.customerid,
-            'hid': booking.hotelid,
-            'rid': booking.roomid,
-            'eid': employee_id,
-            'bid': booking.bookingid,
-            'checkin': booking.checkindate,
-            'checkout': booking.checkoutdate
-        })
-
-        db.session.commit()
-        flash("✅ Booking converted to rental.")
+            SELECT CustomerID, HotelID, RoomID, :eid, BookingID,
+                   CheckInDate, CheckOutDate, 'Ongoing', 0, CURRENT_DATE, 'Pending'
+            FROM Booking
+            WHERE BookingID = ANY(CAST(:ready AS INTEGER[]))
+            RETURNING BookingID, RentalID, HotelID
+        """), dict(params, ready=ready)).fetchall()
+        return results, converted
 
+    try:
+        results, converted = run_in_transaction(check_in)
     except Exception:
         db.session.rollback()
         raise
 
-    return redirect(url_for('employee.employee_dashboard'))
+    if converted:
+        search_cache.invalidate_hotels(*{rental.hotelid for rental in converted})
+    rental_ids = {rental.bookingid: rental.rentalid for rental in converted}
+    for result in results:
+        result['rental_id'] = rental_ids.get(result['booking_id'])
+
+    return render_template("employee/bulk_checkin.html", results=results, converted=len(converted))
 
 @bp_employee.route('/employee/rent-room', methods=['GET', 'POST'])
+@idempotent
 def rent_room():
     if 'user_type' not in session or session['user_type'] != 'employee':
         flash("You must be logged in as an employee.")
@@ -124,30 +261,37 @@ def rent_room():
                 flash("❌ Hotel ID is required for Admin.")
                 return redirect(url_for('employee.rent_room'))
 
-        # Validate CustomerID + Name
-        customer = db.session.execute(
-            text("SELECT * FROM Customer WHERE CustomerID = :cid AND LOWER(FullName) = :name"),
-            {"cid": customer_id, "name": customer_name.lower()}
-        ).fetchone()
-
-        if not customer:
-            flash("❌ Customer ID and Name do not match any existing customer.")
-            return redirect(url_for('employee.rent_room'))
-
-        try:
-            db.session.execute(text("""
-                INSERT INTO Rental (
-                    CustomerID, HotelID, RoomID, EmployeeID,
-                    CheckInDate, CheckOutDate, Status,
-                    PaymentAmount, PaymentDate, PaymentMethod
-                )
-                VALUES (
-                    :customer_id, :hotel_id, :room_id, :employee_id,
-                    :checkin, :checkout, 'Completed',
-                    :payment_amount, CURRENT_DATE, :payment_method
+        def insert_rental():
+            # Validates the customer, locks the room, records the rental and fetches the hotel name in one statement
+            return db.session.execute(text("""
+                WITH customer AS (
+                    SELECT CustomerID FROM Customer
+                    WHERE CustomerID = :customer_id AND LOWER(FullName) = LOWER(:customer_name)
+                ), room AS (
+                    SELECT r.HotelID, r.RoomID, h.HotelName
+                    FROM Room r
+                    JOIN Hotel h ON h.HotelID = r.HotelID
+                    WHERE r.HotelID = :hotel_id AND r.RoomID = :room_id
+                      AND EXISTS (SELECT 1 FROM customer)
+                    FOR NO KEY UPDATE OF r
+                ), rental AS (
+                    INSERT INTO Rental (
+                        CustomerID, HotelID, RoomID, EmployeeID,
+                        CheckInDate, CheckOutDate, Status,
+                        PaymentAmount, PaymentDate, PaymentMethod
+                    )
+                    SELECT customer.CustomerID, room.HotelID, room.RoomID, :employee_id,
+                           :checkin, :checkout, 'Completed',
+                           :payment_amount, CURRENT_DATE, :payment_method
+                    FROM customer CROSS JOIN room
+                    RETURNING RentalID
                 )
+                SELECT EXISTS (SELECT 1 FROM customer) AS customer_found,
+                       (SELECT HotelName FROM room) AS hotel_name,
+                       (SELECT RentalID FROM rental) AS rental_id
             """), {
                 "customer_id": customer_id,
+                "customer_name": customer_name,
                 "hotel_id": hotel_id,
                 "room_id": room_id,
                 "employee_id": employee_id,
@@ -155,29 +299,34 @@ def rent_room():
                 "checkout": checkout,
                 "payment_amount": payment_amount,
                 "payment_method": payment_method
-            })
-            db.session.commit()
-
-            hotel = db.session.execute(text("""
-                SELECT HotelName FROM Hotel WHERE HotelID = :hid
-            """), {"hid": hotel_id}).fetchone()
-
-            return render_template(
-                "employee/rent_success.html",
-                customer_name=customer_name,
-                hotel_name=hotel.hotelname if hotel else f"Hotel #{hotel_id}",
-                room_id=room_id,
-                checkin=checkin,
-                checkout=checkout,
-                payment_amount=float(payment_amount),
-                payment_method=payment_method,
-                current_date=date.today()
-            )
+            }).fetchone()
 
+        try:
+            rental = run_in_transaction(insert_rental)
         except Exception:
             db.session.rollback()
             raise
 
+        if not rental.customer_found:
+            flash("❌ Customer ID and Name do not match any existing customer.")
+            return redirect(url_for('employee.rent_room'))
+        if rental.rental_id is None:
+            flash("❌ Room not found.")
+            return redirect(url_for('employee.rent_room'))
+
+        search_cache.invalidate_hotels(hotel_id)
+        return render_template(
+            "employee/rent_success.html",
+            customer_name=customer_name,
+            hotel_name=rental.hotel_name,
+            room_id=room_id,
+            checkin=checkin,
+            checkout=checkout,
+            payment_amount=float(payment_amount),
+            payment_method=payment_method,
+            current_date=date.today()
+        )
+
     return render_template("employee/rent_form.html", is_admin=(position == "Admin"))
 
 @bp_employee.route('/employee/customers')
@@ -194,13 +343,15 @@ def manage_customers():
         "registered": "RegistrationDate DESC",
         "idtype": "IDType",
     }
-    order_clause = sort_map.get(sort, "CustomerID")
+    pager = KeysetPager.from_request(sort_map.get(sort, "CustomerID"), ("CustomerID",))
 
-    customers = db.session.execute(text(f"""
-        SELECT * FROM Customer ORDER BY {order_clause}
-    """)).fetchall()
+    customers = list(pager.rows(db.session.execute(text(f"""
+        SELECT *, {pager.select_clause} FROM Customer
+        WHERE {pager.where_clause}
+        ORDER BY {pager.order_clause} {pager.limit_clause}
+    """), pager.params)))
 
-    return render_template("employee/customers.html", customers=customers, sort=sort)
+    return render_template("employee/customers.html", customers=customers, sort=sort, pager=pager)
 
 
 @bp_employee.route('/employee/customers/add', methods=['GET', 'POST'])
@@ -310,35 +461,36 @@ def manage_employees():
         "address": "Address",
         "position": "Position",
         "ssn": "SSN",
-        "hotel": "HotelID",
+        "hotel": "COALESCE(HotelID, 0)",
         "id": "EmployeeID"
     }
 
-    order_clause = sort_map.get(sort, "EmployeeID")
+    pager = KeysetPager.from_request(sort_map.get(sort, "EmployeeID"), ("EmployeeID",))
 
     if position == 'Admin':
         query = text(f"""
-            SELECT EmployeeID, FullName, Address, Position, SSN, HotelID
+            SELECT EmployeeID, FullName, Address, Position, SSN, HotelID, {pager.select_clause}
             FROM Employee
-            ORDER BY {order_clause}
+            WHERE {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        params = {}
+        params = pager.params
 
     elif position == 'Manager':
         query = text(f"""
-            SELECT EmployeeID, FullName, Address, Position, SSN, HotelID
+            SELECT EmployeeID, FullName, Address, Position, SSN, HotelID, {pager.select_clause}
             FROM Employee
-            WHERE HotelID = :hid
-            ORDER BY {order_clause}
+            WHERE HotelID = :hid AND {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        params = {'hid': hotel_id}
+        params = {'hid': hotel_id, **pager.params}
 
     else:
         flash("❌ Access denied.")
         return redirect(url_for('employee.employee_dashboard'))
 
-    employees = db.session.execute(query, params).fetchall()
-    return render_template("employee/employees.html", employees=employees, sort=sort)
+    employees = list(pager.rows(db.session.execute(query, params)))
+    return render_template("employee/employees.html", employees=employees, sort=sort, pager=pager)
 
 
 @bp_employee.route('/employee/employees/add', methods=['GET', 'POST'])
@@ -567,13 +719,15 @@ def manage_hotels():
         "id": "HotelID"
     }
 
-    order_clause = sort_map.get(sort, "HotelID")
+    pager = KeysetPager.from_request(sort_map.get(sort, "HotelID"), ("HotelID",))
 
-    hotels = db.session.execute(text(f"""
-        SELECT * FROM Hotel ORDER BY {order_clause}
-    """)).fetchall()
+    hotels = list(pager.rows(db.session.execute(text(f"""
+        SELECT *, {pager.select_clause} FROM Hotel
+        WHERE {pager.where_clause}
+        ORDER BY {pager.order_clause} {pager.limit_clause}
+    """), pager.params)))
 
-    return render_template("employee/hotels.html", hotels=hotels, sort=sort)
+    return render_template("employee/hotels.html", hotels=hotels, sort=sort, pager=pager)
 
 
 
@@ -698,6 +852,8 @@ def edit_hotel(hotel_id):
                 'hid': hotel_id
             })
             db.session.commit()
+            # The hotel may now match area/chain/category searches it did not match before
+            search_cache.clear()
             flash("✅ Hotel updated successfully.")
             return redirect(url_for('employee.manage_hotels'))
 
@@ -724,6 +880,7 @@ def delete_hotel(hotel_id):
     try:
         db.session.execute(text("DELETE FROM Hotel WHERE HotelID = :hid"), {'hid': hotel_id})
         db.session.commit()
+        search_cache.invalidate_hotels(hotel_id)
         flash("✅ Hotel deleted successfully.")
     except Exception:
         db.session.rollback()
@@ -752,20 +909,28 @@ def manage_rooms():
         'viewtype': 'ViewType'
     }
 
-    order_clause = sort_map.get(sort, 'RoomID ASC')
+    pager = KeysetPager.from_request(sort_map.get(sort, 'RoomID ASC'), ("HotelID", "RoomID"))
 
     if position == 'Admin':
-        query = text(f"SELECT * FROM Room ORDER BY {order_clause}")
-        params = {}
+        query = text(f"""
+            SELECT *, {pager.select_clause} FROM Room
+            WHERE {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
+        """)
+        params = pager.params
     elif position == 'Manager':
-        query = text(f"SELECT * FROM Room WHERE HotelID = :hid ORDER BY {order_clause}")
-        params = {'hid': hotel_id}
+        query = text(f"""
+            SELECT *, {pager.select_clause} FROM Room
+            WHERE HotelID = :hid AND {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
+        """)
+        params = {'hid': hotel_id, **pager.params}
     else:
         flash("❌ Access denied.")
         return redirect(url_for('employee.employee_dashboard'))
 
-    rooms = db.session.execute(query, params).fetchall()
-    return render_template("employee/rooms.html", rooms=rooms, sort=sort)
+    rooms = list(pager.rows(db.session.execute(query, params)))
+    return render_template("employee/rooms.html", rooms=rooms, sort=sort, pager=pager)
 
 
 
@@ -820,6 +985,7 @@ def add_room():
                 'status': status
             })
             db.session.commit()
+            search_cache.invalidate_hotels(hotel_id_input)
             flash("✅ Room added successfully.")
             return redirect(url_for('employee.manage_rooms'))
 
@@ -898,6 +1064,7 @@ def edit_room(room_id):
                 'rid': room_id
             })
             db.session.commit()
+            search_cache.invalidate_hotels(room.hotelid, hotel_id_input)
             flash("✅ Room updated successfully.")
             return redirect(url_for('employee.manage_rooms'))
 
@@ -922,6 +1089,7 @@ def delete_room(hotel_id, room_id):
             {'hid': hotel_id, 'rid': room_id}
         )
         db.session.commit()
+        search_cache.invalidate_hotels(hotel_id)
         flash("✅ Room deleted successfully.")
     except Exception:
         db.session.rollback()
@@ -946,18 +1114,20 @@ def manage_room_problems():
         'report_asc': 'rp.ReportDate ASC',
         'roomid': 'rp.RoomID',
         'hotelname': 'h.HotelName',
-        'status': 'rp.Resolved',
+        'status': 'COALESCE(rp.Resolved, FALSE)',
     }
-    order_clause = sort_map.get(sort, 'rp.ReportDate DESC')
+    pager = KeysetPager.from_request(sort_map.get(sort, 'rp.ReportDate DESC'),
+                                     ("rp.HotelID", "rp.RoomID", "rp.Problem"))
 
     if position == 'Admin':
         query = text(f"""
-            SELECT rp.*, h.HotelName
+            SELECT rp.*, h.HotelName, {pager.select_clause}
             FROM RoomProblems rp
             JOIN Hotel h ON rp.HotelID = h.HotelID
-            ORDER BY {order_clause}
+            WHERE {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        problems = db.session.execute(query).fetchall()
+        problems = list(pager.rows(db.session.execute(query, pager.params)))
 
     elif position == 'Manager':
         if not hotel_id:
@@ -965,18 +1135,18 @@ def manage_room_problems():
             return redirect(url_for('employee.employee_dashboard'))
 
         query = text(f"""
-            SELECT rp.*, h.HotelName
+            SELECT rp.*, h.HotelName, {pager.select_clause}
             FROM RoomProblems rp
             JOIN Hotel h ON rp.HotelID = h.HotelID
-            WHERE rp.HotelID = :hid
-            ORDER BY {order_clause}
+            WHERE rp.HotelID = :hid AND {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        problems = db.session.execute(query, {'hid': hotel_id}).fetchall()
+        problems = list(pager.rows(db.session.execute(query, {'hid': hotel_id, **pager.params})))
     else:
         flash("Access denied.")
         return redirect(url_for('employee.employee_dashboard'))
 
-    return render_template('employee/room_problems.html', problems=problems, sort=sort)
+    return render_template('employee/room_problems.html', problems=problems, sort=sort, pager=pager)
 
 
 
@@ -1018,6 +1188,7 @@ def add_room_problem():
                 'rdate': report_date
             })
             db.session.commit()
+            search_cache.invalidate_hotels(hotel_id_form)
             flash("✅ Room problem reported successfully.")
             return redirect(url_for('employee.manage_room_problems'))
 
@@ -1073,6 +1244,7 @@ def edit_room_problem(room_id, problem):
                 'old_prob': problem
             })
             db.session.commit()
+            search_cache.invalidate_hotels(room_problem.hotelid)
             flash("✅ Room problem updated.")
             return redirect(url_for('employee.manage_room_problems'))
 
@@ -1115,6 +1287,7 @@ def delete_room_problem(room_id, problem):
             'prob': problem
         })
         db.session.commit()
+        search_cache.invalidate_hotels(problem_row.hotelid)
         flash("✅ Room problem deleted.")
     except Exception:
         db.session.rollback()
@@ -1144,32 +1317,33 @@ def view_bookings():
         'hotel': 'h.HotelName',
         'status': 'b.Status'
     }
-    order_clause = order_map.get(sort, 'b.CheckInDate DESC')
+    pager = KeysetPager.from_request(order_map.get(sort, 'b.CheckInDate DESC'), ("b.BookingID",))
 
     if position == 'Admin':
         query = text(f"""
             SELECT b.BookingID, c.FullName AS CustomerName, h.HotelName, b.RoomID,
-                   b.BookingDate, b.CheckInDate, b.CheckOutDate, b.Status
+                   b.BookingDate, b.CheckInDate, b.CheckOutDate, b.Status, {pager.select_clause}
             FROM Booking b
             JOIN Customer c ON b.CustomerID = c.CustomerID
             JOIN Hotel h ON b.HotelID = h.HotelID
-            ORDER BY {order_clause}
+            WHERE {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        params = {}
+        params = pager.params
     else:
         query = text(f"""
             SELECT b.BookingID, c.FullName AS CustomerName, h.HotelName, b.RoomID,
-                   b.BookingDate, b.CheckInDate, b.CheckOutDate, b.Status
+                   b.BookingDate, b.CheckInDate, b.CheckOutDate, b.Status, {pager.select_clause}
             FROM Booking b
             JOIN Customer c ON b.CustomerID = c.CustomerID
             JOIN Hotel h ON b.HotelID = h.HotelID
-            WHERE b.HotelID = :hid
-            ORDER BY {order_clause}
+            WHERE b.HotelID = :hid AND {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        params = {'hid': hotel_id}
+        params = {'hid': hotel_id, **pager.params}
 
-    bookings = db.session.execute(query, params).fetchall()
-    return render_template("employee/view_bookings.html", bookings=bookings, sort=sort)
+    bookings = list(pager.rows(db.session.execute(query, params)))
+    return render_template("employee/view_bookings.html", bookings=bookings, sort=sort, pager=pager)
 
 
 @bp_employee.route('/employee/bookings/delete/<int:booking_id>', methods=['POST'])
@@ -1178,8 +1352,12 @@ def delete_booking(booking_id):
         return redirect(url_for('auth.login'))
 
     try:
-        db.session.execute(text("DELETE FROM Booking WHERE BookingID = :bid"), {'bid': booking_id})
+        deleted = db.session.execute(
+            text("DELETE FROM Booking WHERE BookingID = :bid RETURNING HotelID"), {'bid': booking_id}
+        ).fetchone()
         db.session.commit()
+        if deleted:
+            search_cache.invalidate_hotels(deleted.hotelid)
         flash("✅ Booking archived and deleted.")
     except Exception:
         db.session.rollback()
@@ -1210,47 +1388,34 @@ def view_rentals():
         'payment': 'r.PaymentAmount DESC',
         'payment_asc': 'r.PaymentAmount ASC'
     }
-    order_clause = sort_options.get(sort, 'r.CheckInDate DESC')
-
-    
-    db.session.execute(text("""
-        UPDATE Rental
-        SET Status = 'Completed'
-        WHERE Status != 'Completed'
-          AND CURRENT_DATE > CheckOutDate;
-    """))
-    db.session.execute(text("""
-        UPDATE Rental
-        SET Status = 'Ongoing'
-        WHERE Status NOT IN ('Completed')
-          AND CURRENT_DATE BETWEEN CheckInDate AND CheckOutDate;
-    """))
-    db.session.commit()
+    pager = KeysetPager.from_request(sort_options.get(sort, 'r.CheckInDate DESC'), ("r.RentalID",))
 
+    # Read-only: rental and room statuses are moved along by `flask reconcile-rentals`
     if position == 'Admin':
         query = text(f"""
             SELECT r.RentalID, c.FullName AS CustomerName, h.HotelName, r.RoomID,
-                   r.CheckInDate, r.CheckOutDate, r.Status, r.PaymentAmount, r.PaymentMethod
+                   r.CheckInDate, r.CheckOutDate, r.Status, r.PaymentAmount, r.PaymentMethod, {pager.select_clause}
             FROM Rental r
             JOIN Customer c ON r.CustomerID = c.CustomerID
             JOIN Hotel h ON r.HotelID = h.HotelID
-            ORDER BY {order_clause}
+            WHERE {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        params = {}
+        params = pager.params
     else:
         query = text(f"""
             SELECT r.RentalID, c.FullName AS CustomerName, h.HotelName, r.RoomID,
-                   r.CheckInDate, r.CheckOutDate, r.Status, r.PaymentAmount, r.PaymentMethod
+                   r.CheckInDate, r.CheckOutDate, r.Status, r.PaymentAmount, r.PaymentMethod, {pager.select_clause}
             FROM Rental r
             JOIN Customer c ON r.CustomerID = c.CustomerID
             JOIN Hotel h ON r.HotelID = h.HotelID
-            WHERE r.HotelID = :hid
-            ORDER BY {order_clause}
+            WHERE r.HotelID = :hid AND {pager.where_clause}
+            ORDER BY {pager.order_clause} {pager.limit_clause}
         """)
-        params = {'hid': hotel_id}
+        params = {'hid': hotel_id, **pager.params}
 
-    rentals = db.session.execute(query, params).fetchall()
-    return render_template("employee/view_rentals.html", rentals=rentals, sort=sort)
+    rentals = list(pager.rows(db.session.execute(query, params)))
+    return render_template("employee/view_rentals.html", rentals=rentals, sort=sort, pager=pager)
 
 @bp_employee.route('/employee/rentals/delete/<int:rental_id>', methods=['POST'])
 def delete_rental(rental_id):
@@ -1259,11 +1424,14 @@ def delete_rental(rental_id):
 
     try:
 
-        db.session.execute(text("""
+        deleted = db.session.execute(text("""
             DELETE FROM Rental WHERE RentalID = :rid
-        """), {'rid': rental_id})
+            RETURNING HotelID
+        """), {'rid': rental_id}).fetchone()
 
         db.session.commit()
+        if deleted:
+            search_cache.invalidate_hotels(deleted.hotelid)
         flash("✅ Rental archived and deleted.")
     except Exception:
         db.session.rollback()
@@ -1274,6 +1442,7 @@ def delete_rental(rental_id):
 
 
 @bp_employee.route('/employee/rentals/payment', methods=['POST'])
+@idempotent
 def add_payment():
     if 'user_type' not in session or session['user_type'] != 'employee':
         return redirect(url_for('auth.login'))
@@ -1303,6 +1472,31 @@ def add_payment():
     return redirect(url_for('employee.view_rentals'))
 
 
+def _archive_filters(position, hotel_id):
+    """
+    WHERE clause and params shared by the archive pages: the employee's hotel (unless Admin) and an
+    ArchiveDate range, so only the matching yearly partitions are read. The range defaults to the
+    last year; an empty field means no bound.
+    """
+    date_from = request.args.get('from', (date.today() - timedelta(days=365)).isoformat())
+    date_to = request.args.get('to', '')
+    clauses, params = [], {}
+    if position != 'Admin':
+        clauses.append("HotelID = :hid")
+        params['hid'] = hotel_id
+    try:
+        if date_from:
+            params['date_from'] = date.fromisoformat(date_from)
+            clauses.append("ArchiveDate >= :date_from")
+        if date_to:
+            params['date_to'] = date.fromisoformat(date_to)
+            clauses.append("ArchiveDate <= :date_to")
+    except ValueError:
+        flash("❌ Invalid archive date range.", "danger")
+        return None, None, date_from, date_to
+    return "WHERE " + " AND ".join(clauses or ["TRUE"]), params, date_from, date_to
+
+
 @bp_employee.route('/employee/bookings/archive')
 def view_booking_archive():
     if 'user_type' not in session or session['user_type'] != 'employee':
@@ -1324,23 +1518,19 @@ def view_booking_archive():
         'customer': 'CustomerName',
         'hotel': 'HotelName'
     }
-    order_clause = order_map.get(sort, 'ArchiveDate DESC')
+    pager = KeysetPager.from_request(order_map.get(sort, 'ArchiveDate DESC'), ("BookingID", "ArchiveDate"))
 
-    if position == 'Admin':
-        query = text(f"SELECT * FROM BookingArchive ORDER BY {order_clause}")
-        params = {}
-    else:
-        query = text(f"""
-            SELECT * FROM BookingArchive 
-            WHERE HotelName IN (
-                SELECT HotelName FROM Hotel WHERE HotelID = :hid
-            )
-            ORDER BY {order_clause}
-        """)
-        params = {'hid': hotel_id}
+    where, params, date_from, date_to = _archive_filters(position, hotel_id)
+    if where is None:
+        return redirect(url_for('employee.view_booking_archive', sort=sort))
 
-    archived_bookings = db.session.execute(query, params).fetchall()
-    return render_template("employee/booking_archive.html", bookings=archived_bookings, sort=sort)
+    archived_bookings = list(pager.rows(db.session.execute(text(f"""
+        SELECT *, {pager.select_clause} FROM BookingArchive
+        {where} AND {pager.where_clause}
+        ORDER BY {pager.order_clause} {pager.limit_clause}
+    """), {**params, **pager.params})))
+    return render_template("employee/booking_archive.html", bookings=archived_bookings, sort=sort,
+                           date_from=date_from, date_to=date_to, pager=pager)
 
 
 
@@ -1367,20 +1557,58 @@ def view_rental_archive():
     elif sort == "hotel":
         order_clause = "HotelName"
     elif sort == "employee":
-        order_clause = "EmployeeName"
+        order_clause = "COALESCE(EmployeeName, '')"
+    pager = KeysetPager.from_request(order_clause, ("RentalID", "ArchiveDate"))
 
-    if position == 'Admin':
-        query = text(f"SELECT * FROM RentalArchive ORDER BY {order_clause}")
-        params = {}
-    else:
-        query = text(f"""
-            SELECT * FROM RentalArchive 
-            WHERE HotelName IN (
-                SELECT HotelName FROM Hotel WHERE HotelID = :hid
-            )
-            ORDER BY {order_clause}
-        """)
-        params = {'hid': hotel_id}
+    where, params, date_from, date_to = _archive_filters(position, hotel_id)
+    if where is None:
+        return redirect(url_for('employee.view_rental_archive', sort=sort))
+
+    archived_rentals = list(pager.rows(db.session.execute(text(f"""
+        SELECT *, {pager.select_clause} FROM RentalArchive
+        {where} AND {pager.where_clause}
+        ORDER BY {pager.order_clause} {pager.limit_clause}
+    """), {**params, **pager.params})))
+    return render_template("employee/rental_archive.html", rentals=archived_rentals, sort=sort,
+                           date_from=date_from, date_to=date_to, pager=pager)
+
+
+@bp_employee.route('/employee/export/<kind>.csv')
+def export_csv(kind):
+    if 'user_type' not in session or session['user_type'] != 'employee':
+        return redirect(url_for('auth.login'))
+
+    position = session.get('position')
+    if position not in ['Admin', 'Manager', 'Receptionist'] or kind not in EXPORTS:
+        flash("❌ Access denied.")
+        return redirect(url_for('employee.employee_dashboard'))
+
+    # Same filters as the pages: employees get their own hotel, Admins any (or all)
+    hotel_id = session.get('hotel_id')
+    if position != 'Admin' and hotel_id is None:
+        flash("⚠️ Hotel information missing for your account.")
+        return redirect(url_for('employee.employee_dashboard'))
+    try:
+        if position == 'Admin':
+            hotel_id = int(request.args['hotel_id']) if request.args.get('hotel_id') else None
+        date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        flash("❌ Invalid export filters.", "danger")
+        return redirect(url_for('employee.employee_dashboard'))
+
+    # Streamed from a server-side cursor, so a multi-year export never sits in memory
+    rows = stream_csv(kind, hotel_id=hotel_id, date_from=date_from, date_to=date_to)
+    filename = f"{kind}-{date.today().isoformat()}.csv"
+    return Response(stream_with_context(rows), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+@bp_employee.route('/employee/search-cache')
+def search_cache_stats():
+    if 'user_type' not in session or session['user_type'] != 'employee' or session.get('position') != 'Admin':
+        flash("❌ Access denied.")
+        return redirect(url_for('auth.login'))
 
-    archived_rentals = db.session.execute(query, params).fetchall()
-    return render_template("employee/rental_archive.html", rentals=archived_rentals)
\ No newline at end of file
+    # Hit/miss counters for sizing SEARCH_CACHE_SIZE and SEARCH_CACHE_TTL
+    return jsonify(search_cache.stats())
@@ -0,0 +1,203 @@
+from datetime import datetime
+from sqlalchemy import text
+from app import db
+
+# Request arguments that narrow a room search, in the order they appear in the search form
+SEARCH_FILTERS = ('capacity', 'viewtype', 'area', 'chain', 'category', 'price', 'minrooms', 'minhotelrooms', 'fuzzy')
+
+# Filters that depend only on the hotel, not on the room
+HOTEL_FILTERS = ('area', 'chain', 'category', 'minrooms', 'minhotelrooms')
+
+SORT_MAP = {
+    "price": "rs.Price",
+    "price_desc": "rs.Price DESC",
+    "rating": "rs.Rating DESC",
+    "rating_asc": "rs.Rating ASC",
+    "category": "rs.Category",
+    "capacity": "rs.CapacityRank DESC",
+    "capacity_asc": "rs.CapacityRank ASC",
+    "amenities": "rs.AmenityCount DESC",
+    "amenities_least": "rs.AmenityCount ASC",
+}
+DEFAULT_SORT = "price"
+
+# Width of the price facet buckets, in dollars
+PRICE_BUCKET = 100
+
+# Facets reported by the facet endpoint, in GROUPING() bit order (leftmost column = highest bit)
+FACETS = ('capacity', 'viewtype', 'category', 'chain', 'price')
+
+# Flexible-date search limits: check-in shifted by up to ±FLEX_MAX_DAYS, stays up to FLEX_MAX_NIGHTS
+FLEX_MAX_DAYS = 7
+FLEX_MAX_NIGHTS = 30
+
+
+# Rooms a customer can be offered at all (on any dates); the search pages and the hotel calendar share it
+BOOKABLE_CLAUSE = "rs.Status = 'Available'"
+
+
+def availability_clause(checkin, checkout):
+    """A room is free for [checkin, checkout) when none of those nights is in the calendar."""
+    return f"""NOT EXISTS (
+    SELECT 1 FROM RoomCalendar rc
+    WHERE rc.HotelID = rs.HotelID AND rc.RoomID = rs.RoomID
+    AND rc.Night >= {checkin} AND rc.Night < {checkout}
+)"""
+
+
+AVAILABILITY_CLAUSE = availability_clause(":checkin", ":checkout")
+
+
+def parse_stay(args):
+    """Return (checkin, checkout, error) from the checkin/checkout request arguments."""
+    try:
+        checkin = datetime.strptime(args.get("checkin"), "%Y-%m-%d").date()
+        checkout = datetime.strptime(args.get("checkout"), "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None, None, "Invalid dates"
+    if checkin >= checkout:
+        return checkin, checkout, "Check-out must be after check-in"
+    return checkin, checkout, None
+
+
+def normalize_filters(args):
+    """Non-empty search filters, trimmed; area and chain are lower-cased since they match case-insensitively."""
+    filters = {}
+    for name in SEARCH_FILTERS:
+        value = (args.get(name) or '').strip()
+        if not value:
+            continue
+        if name in ('area', 'chain'):
+            value = value.lower()
+        filters[name] = value
+    return filters
+
+
+def normalize_sort(sort):
+    return sort if sort in SORT_MAP else DEFAULT_SORT
+
+
+def _text_match(column, name, filters, params):
+    """
+    Substring match (ILIKE '%x%') or, in fuzzy mode, pg_trgm word similarity (x <% column).
+    Both forms are served by the gin_trgm_ops indexes on Hotel.Address and HotelChain.ChainName.
+    """
+    if 'fuzzy' in filters:
+        params[name] = filters[name]
+        return f":{name} <% {column}"
+    params[name] = f"%{filters[name]}%"
+    return f"{column} ILIKE :{name}"
+
+
+def filter_clauses(filters):
+    """WHERE conditions and bind parameters on RoomSearch rs for normalized filters."""
+    clauses = [BOOKABLE_CLAUSE]
+    params = {}
+
+    if 'capacity' in filters:
+        clauses.append("rs.Capacity = :capacity")
+        params['capacity'] = filters['capacity']
+
+    # Matched on the hotel and chain tables, whose trigram indexes turn the text match into a
+    # short list of keys; RoomSearch is then probed by its (HotelID, RoomID) and HotelChainID indexes
+    if 'area' in filters:
+        match = _text_match("h.Address", 'area', filters, params)
+        clauses.append(f"rs.HotelID IN (SELECT h.HotelID FROM Hotel h WHERE {match})")
+
+    if 'chain' in filters:
+        match = _text_match("hc.ChainName", 'chain', filters, params)
+        clauses.append(f"rs.HotelChainID IN (SELECT hc.HotelChainID FROM HotelChain hc WHERE {match})")
+
+    if 'category' in filters:
+        clauses.append("rs.Category = :category")
+        params['category'] = filters['category']
+
+    if 'price' in filters:
+        clauses.append("rs.Price <= :price")
+        params['price'] = filters['price']
+
+    if 'minrooms' in filters:
+        clauses.append("rs.Num_Rooms >= :minrooms")
+        params['minrooms'] = filters['minrooms']
+
+    if 'minhotelrooms' in filters:
+        clauses.append("rs.Num_Rooms >= :minhotelrooms")
+        params['minhotelrooms'] = filters['minhotelrooms']
+
+    if 'viewtype' in filters:
+        clauses.append("rs.ViewType = :viewtype")
+        params['viewtype'] = filters['viewtype']
+
+    return clauses, params
+
+
+def hotel_filter_clauses(filters):
+    """
+    WHERE conditions on Hotel h / HotelChain hc selecting the hotels a search can return,
+    or None when the search is not restricted by hotel.
+    """
+    if not any(name in filters for name in HOTEL_FILTERS):
+        return None, {}
+
+    clauses = []
+    params = {}
+
+    if 'area' in filters:
+        clauses.append(_text_match("h.Address", 'area', filters, params))
+
+    if 'chain' in filters:
+        clauses.append(_text_match("hc.ChainName", 'chain', filters, params))
+
+    if 'category' in filters:
+        clauses.append("h.Category = :category")
+        params['category'] = filters['category']
+
+    if 'minrooms' in filters:
+        clauses.append("h.Num_Rooms >= :minrooms")
+        params['minrooms'] = filters['minrooms']
+
+    if 'minhotelrooms' in filters:
+        clauses.append("h.Num_Rooms >= :minhotelrooms")
+        params['minhotelrooms'] = filters['minhotelrooms']
+
+    return clauses, params
+
+
+def cache_key(kind, checkin, checkout, filters, *extra):
+    return (kind, checkin.isoformat(), checkout.isoformat(), tuple(sorted(filters.items()))) + extra
+
+
+def room_search_query(filters, pager, checkin, checkout):
+    """SQL and bind parameters for one keyset page of rooms available for [checkin, checkout)."""
+    clauses, params = filter_clauses(filters)
+    clauses.append(pager.where_clause)
+    params.update(pager.params, checkin=checkin, checkout=checkout)
+
+    # RoomSearch already carries the hotel, chain, amenity and problem fields of each room
+    query = f"""
+        SELECT rs.HotelID, rs.RoomID, rs.Price, rs.Capacity, rs.ViewType, rs.Extendable, rs.Status,
+               rs.HotelName, rs.Address, rs.ChainName, rs.Rating, rs.Num_Rooms,
+               rs.Amenities, rs.ProblemCause AS problem_cause,
+               {pager.select_clause}
+        FROM RoomSearch rs
+        WHERE
+            {' AND '.join(clauses)} AND
+            {AVAILABILITY_CLAUSE}
+        ORDER BY {pager.order_clause}
+        {pager.limit_clause}
+    """
+    return query, params
+
+
+def candidate_hotels(filters):
+    """Hotels whose writes can change the results of a search, or None for any hotel."""
+    clauses, params = hotel_filter_clauses(filters)
+    if clauses is None:
+        return None
+    rows = db.session.execute(text(f"""
+        SELECT h.HotelID
+        FROM Hotel h
+        JOIN HotelChain hc ON h.HotelChainID = hc.HotelChainID
+        WHERE {' AND '.join(clauses)}
+    """), params).fetchall()
+    return frozenset(row.hotelid for row in rows)
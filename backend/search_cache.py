@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SearchCache:
+    """
+    In-process LRU cache with a TTL for room search results.
+
+    Every entry remembers the hotels it depends on (None means any hotel), so a write
+    only drops the entries it can affect. Pages read while a write was happening are
+    not stored: put() compares the generation taken before the read with the current one.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('SEARCH_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('SEARCH_CACHE_TTL', self.ttl)
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, hotels=None, generation=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, hotels, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_hotels(self, *hotel_ids):
+        hotel_ids = {int(hotel_id) for hotel_id in hotel_ids if hotel_id is not None}
+        with self._lock:
+            self._generation += 1
+            for key, (_, hotels, _) in list(self._entries.items()):
+                if hotels is None or hotels & hotel_ids:
+                    del self._entries[key]
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+search_cache = SearchCache()